@@ -0,0 +1,249 @@
+#aggregate.py
+
+# Estatísticas de ensembles muito grandes (10^5 a 10^6 descidas) com memória constante
+# Os resultados são consumidos à medida que saem (um Solver, um lote de solve_ensemble) e descartados; só ficam:
+#   - média e covariância de (x_final, v_impacto, t_voo) pelo algoritmo de Welford (em lotes)
+#   - esboços de quantis (DDSketch) de cada uma dessas saídas, com erro relativo limitado (alpha)
+#   - histograma 2D de resolução fixa da "pegada" de pouso
+# O modelo é plano (só x no solo), então a pegada é x_final x v_impacto, o que mostra onde e com que velocidade o foguete chega
+
+# Agregadores de processos diferentes se juntam com merge (o resultado é o mesmo de ter agregado tudo num só)
+# A memória não depende do número de descidas: o esboço tem no máximo max_buckets baldes e o histograma só guarda as células visitadas
+
+# Exemplo:
+#   agregador = run_ensemble(10**6, {'m': 0.2, 'vx': 1.5, 'cdM': 0.05}, seed=1)
+#   print(agregador.summary())
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from solver import Solver
+
+# Saídas acompanhadas (mesmos nomes do resumo do Solver e do resultado de solve_ensemble)
+QUANTIDADES = ('x_final', 'v_impacto', 't_voo')
+
+class QuantileSketch:
+    # Esboço de quantis DDSketch: valores agrupados em baldes logarítmicos de razão gamma = (1 + alpha)/(1 - alpha)
+    # Qualquer quantil sai com erro relativo <= alpha; valores negativos ficam num conjunto de baldes à parte
+
+    def __init__(self, alpha=0.01, max_buckets=2048):
+        self.alpha = alpha
+        self.max_buckets = max_buckets
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+        self.positivos = {}
+        self.negativos = {}
+        self.zeros = 0
+        self.n = 0
+
+    def _keys(self, v):
+        # Índice do balde de cada |v| > 0: ceil(log_gamma(|v|))
+        return np.ceil(np.log(v) / self._log_gamma).astype(np.int64)
+
+    def add(self, valores):
+        # Acrescenta um valor ou um array de valores (NaN são ignorados)
+        v = np.asarray(valores, dtype=float).ravel()
+        v = v[~np.isnan(v)]
+        self.n += v.size
+        self.zeros += int(np.count_nonzero(v == 0))
+        for baldes, parte in ((self.positivos, v[v > 0]), (self.negativos, -v[v < 0])):
+            if parte.size:
+                chaves, contagens = np.unique(self._keys(parte), return_counts=True)
+                for chave, contagem in zip(chaves.tolist(), contagens.tolist()):
+                    baldes[chave] = baldes.get(chave, 0) + contagem
+        self._collapse()
+
+    def _collapse(self):
+        # Limita a memória: junta os baldes de menor módulo (o erro relativo só piora para os valores mais próximos de zero)
+        for baldes in (self.positivos, self.negativos):
+            if len(baldes) > self.max_buckets:
+                chaves = sorted(baldes)
+                excesso = chaves[:len(chaves) - self.max_buckets + 1]
+                total = sum(baldes.pop(chave) for chave in excesso)
+                baldes[excesso[-1]] = baldes.get(excesso[-1], 0) + total
+
+    def merge(self, outro):
+        # Junta outro esboço (mesmo alpha) a este
+        if outro.alpha != self.alpha:
+            raise ValueError("Só é possível juntar esboços com o mesmo alpha.")
+        for baldes, outros in ((self.positivos, outro.positivos), (self.negativos, outro.negativos)):
+            for chave, contagem in outros.items():
+                baldes[chave] = baldes.get(chave, 0) + contagem
+        self.zeros += outro.zeros
+        self.n += outro.n
+        self._collapse()
+        return self
+
+    def _value(self, chave):
+        # Valor representativo do balde (erro relativo <= alpha para qualquer valor dentro dele)
+        return 2 * math.exp(chave * self._log_gamma) / ((1 + self.alpha) / (1 - self.alpha) + 1)
+
+    def quantile(self, q):
+        # Quantil q (0 a 1); NaN se o esboço estiver vazio
+        if self.n == 0:
+            return math.nan
+        posicao = q * (self.n - 1)
+
+        acumulado = 0
+        for chave in sorted(self.negativos, reverse=True): # Do mais negativo para o mais próximo de zero
+            acumulado += self.negativos[chave]
+            if acumulado > posicao:
+                return -self._value(chave)
+        acumulado += self.zeros
+        if acumulado > posicao:
+            return 0.0
+        for chave in sorted(self.positivos):
+            acumulado += self.positivos[chave]
+            if acumulado > posicao:
+                return self._value(chave)
+        return self._value(max(self.positivos))
+
+class EnsembleAggregator:
+    def __init__(self, dx=10.0, dv=0.1, alpha=0.01):
+        # dx, dv: resolução do histograma da pegada de pouso [m] e [m/s]
+        # alpha: erro relativo dos quantis
+
+        self.dx, self.dv = dx, dv
+        self.n = 0
+        self.falhas = 0 # Descidas que não chegaram ao solo (t_max) ou com saída NaN; ficam fora das estatísticas
+
+        # Welford: média e soma dos produtos dos desvios (M2) de (x_final, v_impacto, t_voo)
+        self.media = np.zeros(len(QUANTIDADES))
+        self._M2 = np.zeros((len(QUANTIDADES), len(QUANTIDADES)))
+
+        self.sketches = {nome: QuantileSketch(alpha) for nome in QUANTIDADES}
+
+        # Histograma esparso {(i, j): contagem}, com i = floor(x/dx) e j = floor(v/dv)
+        self.histograma = {}
+
+    def add_values(self, x_final, v_impacto, t_voo):
+        # Acrescenta um lote de descidas (escalares ou arrays do mesmo tamanho)
+        dados = np.array([np.ravel(x_final), np.ravel(v_impacto), np.ravel(t_voo)], dtype=float)
+        validos = ~np.any(np.isnan(dados), axis=0)
+        self.falhas += int(np.count_nonzero(~validos))
+        dados = dados[:, validos]
+        n_b = dados.shape[1]
+        if n_b == 0:
+            return self
+
+        # Welford em lotes (fórmula de Chan): junta média e M2 do lote aos acumulados
+        media_b = dados.mean(axis=1)
+        desvios = dados - media_b[:, None]
+        self._combine(n_b, media_b, desvios @ desvios.T)
+
+        for nome, linha in zip(QUANTIDADES, dados):
+            self.sketches[nome].add(linha)
+
+        celulas = np.stack([np.floor(dados[0] / self.dx), np.floor(dados[1] / self.dv)]).astype(np.int64)
+        celulas, contagens = np.unique(celulas, axis=1, return_counts=True)
+        for i, j, contagem in zip(celulas[0].tolist(), celulas[1].tolist(), contagens.tolist()):
+            self.histograma[(i, j)] = self.histograma.get((i, j), 0) + contagem
+        return self
+
+    def _combine(self, n_b, media_b, M2_b):
+        n = self.n + n_b
+        delta = media_b - self.media
+        self.media = self.media + delta * n_b / n
+        self._M2 = self._M2 + M2_b + np.outer(delta, delta) * self.n * n_b / n
+        self.n = n
+
+    def add(self, solver):
+        # Acrescenta a última solução de um Solver (só os números do resumo; a solução pode ser descartada depois)
+        # Uma solução que parou em t_max sem chegar ao solo conta como falha (o resumo seria o último estado no ar)
+        if not len(solver.sol.t_events[0]):
+            self.falhas += 1
+            return self
+        resumo = solver.summary()
+        return self.add_values(resumo['x_final'], resumo['v_impacto'], resumo['t_voo'])
+
+    def add_ensemble(self, resultado):
+        # Acrescenta um lote de Solver.solve_ensemble; os membros que não pousaram (pousou = False) contam como falhas
+        pousou = resultado['pousou']
+        self.falhas += int(np.count_nonzero(~pousou))
+        return self.add_values(resultado['x_final'][pousou], resultado['v_impacto'][pousou], resultado['t_voo'][pousou])
+
+    def merge(self, outro):
+        # Junta outro agregador (mesma resolução) a este, ex: os de cada processo de um pool
+        if (outro.dx, outro.dv) != (self.dx, self.dv):
+            raise ValueError("Só é possível juntar agregadores com a mesma resolução de histograma.")
+        if outro.n:
+            self._combine(outro.n, outro.media, outro._M2)
+        self.falhas += outro.falhas
+        for nome in QUANTIDADES:
+            self.sketches[nome].merge(outro.sketches[nome])
+        for celula, contagem in outro.histograma.items():
+            self.histograma[celula] = self.histograma.get(celula, 0) + contagem
+        return self
+
+    def mean(self):
+        # Média de cada saída: {nome: valor}
+        return dict(zip(QUANTIDADES, self.media.tolist()))
+
+    def cov(self):
+        # Matriz de covariância (amostral) na ordem de QUANTIDADES
+        if self.n < 2:
+            return np.full_like(self._M2, np.nan)
+        return self._M2 / (self.n - 1)
+
+    def quantile(self, nome, q):
+        return self.sketches[nome].quantile(q)
+
+    def histogram(self):
+        # Histograma denso da pegada: (bordas em x, bordas em v, contagens com formato (nx, nv))
+        if not self.histograma:
+            return np.array([]), np.array([]), np.zeros((0, 0), dtype=np.int64)
+        celulas = np.array(list(self.histograma))
+        i0, j0 = celulas.min(axis=0)
+        i1, j1 = celulas.max(axis=0)
+        contagens = np.zeros((i1 - i0 + 1, j1 - j0 + 1), dtype=np.int64)
+        contagens[celulas[:, 0] - i0, celulas[:, 1] - j0] = list(self.histograma.values())
+        return np.arange(i0, i1 + 2) * self.dx, np.arange(j0, j1 + 2) * self.dv, contagens
+
+    def summary(self):
+        # Resumo: média, desvio, quantis (5%, 50%, 95%) de cada saída e a correlação entre elas
+        cov = self.cov()
+        desvios = np.sqrt(np.diag(cov))
+        resumo = {'n': self.n, 'falhas': self.falhas}
+        for k, nome in enumerate(QUANTIDADES):
+            resumo[nome] = {
+                'media': float(self.media[k]),
+                'desvio': float(desvios[k]),
+                'p05': self.quantile(nome, 0.05),
+                'p50': self.quantile(nome, 0.5),
+                'p95': self.quantile(nome, 0.95),
+            }
+        resumo['correlacao'] = (cov / np.outer(desvios, desvios)).tolist()
+        return resumo
+
+def _run_batch(config, sigmas, n, seed, opcoes):
+    # Executado nos processos do pool: um lote do ensemble, agregado e descartado
+    solver = Solver(config)
+    params = solver.sample_ensemble(n, sigmas, seed=seed)
+    agregador = EnsembleAggregator(**opcoes)
+    agregador.add_ensemble(solver.solve_ensemble(params))
+    return agregador
+
+def run_ensemble(n, sigmas, config=None, lote=20000, workers=None, seed=None, **opcoes):
+    # Roda n descidas em lotes de solve_ensemble num pool de processos e retorna um único EnsembleAggregator
+    # Cada agregador de lote é juntado ao total assim que fica pronto e descartado: nunca ficam os resultados de todas as descidas
+    # sigmas: ver Solver.sample_ensemble; config: SimConfig (None usa o config.py); opcoes: dx, dv, alpha do agregador
+
+    config = config or Solver().config
+    tamanhos = [min(lote, n - inicio) for inicio in range(0, n, lote)]
+    sementes = np.random.SeedSequence(seed).spawn(len(tamanhos))
+    total = EnsembleAggregator(**opcoes)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for tamanho, semente in zip(tamanhos, sementes):
+            total.merge(_run_batch(config, sigmas, tamanho, semente, opcoes))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(_run_batch, config, sigmas, tamanho, semente, opcoes) for tamanho, semente in zip(tamanhos, sementes)}
+        for futuro in as_completed(futuros):
+            total.merge(futuro.result())
+            futuros.discard(futuro) # Solta a referência: o agregador do lote pode ser liberado
+    return total
@@ -0,0 +1,199 @@
+#atmosphere.py
+
+# Modelo de atmosfera usado pelo Solver para a densidade do ar em função da altitude
+# As constantes de cada camada são calculadas uma única vez na construção, e não a cada chamada
+# Aceita escalares (caminho rápido em Python puro) ou arrays do NumPy (uma única chamada vetorizada)
+
+# Dois modos:
+#   - exato: fórmulas das camadas a cada chamada
+#   - tabela: interpolação linear numa tabela com passo dy sobre [0, y_max]
+#             O erro relativo da interpolação linear é no máximo dy²/(8H²), onde H ~ 6-9 km é a escala de altura da densidade
+#             (~3e-9 com dy = 1 m). O erro máximo real da tabela é medido na construção e fica em max_error
+
+import math
+import numpy as np
+
+class Atmosphere:
+    def __init__(self, R, M, L1, L2, T0, P0, h0, g, y_max=None, table=False, dy=1.0):
+        # R, M, L1, L2, T0, P0, h0, g: mesmos parâmetros do config.py (ver Solver)
+        # y_max: topo da tabela (altitude em relação ao solo), obrigatório no modo tabela
+        # table: True para o modo tabela
+        # dy: passo da tabela [m]
+
+        self.R, self.M, self.L1, self.L2, self.T0, self.P0, self.h0, self.g = R, M, L1, L2, T0, P0, h0, g
+
+        # Não faço ideia do que tá acontendo aqui, segui o que foi feito no código antigo e fuçando na internet
+        # Seria interessante olhar com mais cuidado
+
+        # 1. Camada troposférica (solo até 11 km de altitude absoluta)
+        self.expoente_trop = -g * M / (R * L1)
+
+        # 2. Baixa estratosfera (11-20 km de altitude absoluta): condições no topo da troposfera e temperatura constante
+        self.y_trop = 11000 - h0
+        self.T_trop = T0 + L1 * self.y_trop
+        self.P_trop = P0 * (self.T_trop / T0) ** self.expoente_trop
+        self.c_iso = g * M / (R * self.T_trop)
+
+        # 3. Alta estratosfera (20-25 km de altitude absoluta): gradiente térmico estratosférico acima de 20 km
+        self.y_20k = 20000 - h0
+        self.P_20k = self.P_trop * math.exp(-self.c_iso * (20000 - 11000))
+        self.expoente_upper = -g * M / (R * L2)
+
+        # rho = P*M/(R*T)
+        self.M_R = M / R
+
+        self.table = table
+        self.dy = dy
+        self.y_max = y_max
+        self.max_error = 0.0
+
+        if table:
+            if y_max is None:
+                raise ValueError("O modo tabela precisa de y_max.")
+
+            n = int(math.ceil(y_max / dy)) + 1
+            self._y_tab = np.arange(n + 1) * dy # Um ponto a mais para cobrir y_max
+            self._rho_tab = self.rho_exact(self._y_tab)
+            self._drho_tab = np.diff(self._rho_tab)
+            self._y_tab_max = self._y_tab[-1]
+
+            # Cópias em listas do Python: indexar listas com escalares é bem mais rápido que indexar arrays
+            self._rho_lista = self._rho_tab.tolist()
+            self._drho_lista = self._drho_tab.tolist()
+
+            # Erro relativo máximo da interpolação (o pior caso da interpolação linear é no meio de cada intervalo)
+            y_meio = self._y_tab[:-1] + dy / 2
+            exato = self.rho_exact(y_meio)
+            self.max_error = float(np.max(np.abs(self._rho_table(y_meio) - exato) / exato))
+
+    def _rho_exact_scalar(self, y):
+        # Densidade pelas fórmulas das camadas para um escalar, sem checar o tipo
+        # (o Solver chama direto a cada avaliação do lado direito da EDO, ver Solver.__init__)
+        y = float(y) # Aritmética com float do Python é mais rápida que com np.float64
+        h_abs = y + self.h0
+
+        if h_abs <= 11000:
+            T = self.T0 + self.L1 * y
+            P = self.P0 * (T / self.T0) ** self.expoente_trop
+        elif h_abs <= 20000:
+            T = self.T_trop
+            P = self.P_trop * math.exp(-self.c_iso * (h_abs - 11000))
+        else:
+            T = self.T_trop + self.L2 * (h_abs - 20000)
+            P = self.P_20k * (T / self.T_trop) ** self.expoente_upper
+
+        return P * self.M_R / T
+
+    def _rho_table_scalar(self, y):
+        # Densidade pela tabela para um escalar, sem checar o tipo; fora da tabela usa as fórmulas
+        if 0 <= y < self._y_tab_max:
+            u = float(y) / self.dy
+            i = int(u)
+            return self._rho_lista[i] + (u - i) * self._drho_lista[i]
+        return self._rho_exact_scalar(y)
+
+    def rho_exact(self, y):
+        # Densidade pelas fórmulas das camadas
+
+        if isinstance(y, (float, int)):
+            return self._rho_exact_scalar(y)
+
+        y = np.asarray(y, dtype=float)
+        h_abs = y + self.h0
+
+        T = np.empty_like(y)
+        P = np.empty_like(y)
+
+        trop = h_abs <= 11000
+        upper = h_abs > 20000
+        iso = ~(trop | upper)
+
+        T[trop] = self.T0 + self.L1 * y[trop]
+        P[trop] = self.P0 * (T[trop] / self.T0) ** self.expoente_trop
+
+        T[iso] = self.T_trop
+        P[iso] = self.P_trop * np.exp(-self.c_iso * (h_abs[iso] - 11000))
+
+        T[upper] = self.T_trop + self.L2 * (h_abs[upper] - 20000)
+        P[upper] = self.P_20k * (T[upper] / self.T_trop) ** self.expoente_upper
+
+        return P * self.M_R / T
+
+    def drho_exact(self, y):
+        # Derivada da densidade com a altitude, d(rho)/dy [kg/m⁴], pelas fórmulas das camadas
+        # Troposfera e alta estratosfera: rho ~ T^(expoente - 1) --> drho/dy = rho*(expoente - 1)*L/T
+        # Baixa estratosfera (isotérmica): rho ~ exp(-c*h) --> drho/dy = -c*rho
+
+        if isinstance(y, (float, int)):
+            y = float(y)
+            h_abs = y + self.h0
+            rho = self.rho_exact(y)
+
+            if h_abs <= 11000:
+                return rho * (self.expoente_trop - 1) * self.L1 / (self.T0 + self.L1 * y)
+            elif h_abs <= 20000:
+                return -self.c_iso * rho
+            else:
+                return rho * (self.expoente_upper - 1) * self.L2 / (self.T_trop + self.L2 * (h_abs - 20000))
+
+        y = np.asarray(y, dtype=float)
+        h_abs = y + self.h0
+        rho = self.rho_exact(y)
+
+        trop = h_abs <= 11000
+        upper = h_abs > 20000
+        iso = ~(trop | upper)
+
+        out = np.empty_like(y)
+        out[trop] = rho[trop] * (self.expoente_trop - 1) * self.L1 / (self.T0 + self.L1 * y[trop])
+        out[iso] = -self.c_iso * rho[iso]
+        out[upper] = rho[upper] * (self.expoente_upper - 1) * self.L2 / (self.T_trop + self.L2 * (h_abs[upper] - 20000))
+        return out
+
+    def drho(self, y):
+        # Derivada d(rho)/dy consistente com o modo escolhido (no modo tabela, inclinação do intervalo da tabela)
+
+        if not self.table:
+            return self.drho_exact(y)
+
+        if isinstance(y, (float, int)):
+            if 0 <= y < self._y_tab_max:
+                return self._drho_lista[int(float(y) / self.dy)] / self.dy
+            return self.drho_exact(y)
+
+        y = np.asarray(y, dtype=float)
+        dentro = (y >= 0) & (y < self._y_tab_max)
+        out = self.drho_exact(y)
+        out[dentro] = self._drho_tab.take((y[dentro] / self.dy).astype(np.intp)) / self.dy
+        return out
+
+    def _rho_table(self, y):
+        # Interpolação linear na tabela (y deve estar dentro de [0, y_max])
+
+        if isinstance(y, (float, int)):
+            u = float(y) / self.dy
+            i = int(u)
+            return self._rho_lista[i] + (u - i) * self._drho_lista[i]
+
+        u = y / self.dy
+        i = u.astype(np.intp)
+        return self._rho_tab.take(i) + (u - i) * self._drho_tab.take(i)
+
+    def rho(self, y):
+        # Densidade do ar [kg/m³] na altitude y (em relação ao solo), escalar ou array
+
+        if not self.table:
+            return self.rho_exact(y)
+
+        if isinstance(y, (float, int)):
+            return self._rho_table_scalar(y)
+
+        y = np.asarray(y, dtype=float)
+        if y.size and y.min() >= 0 and y.max() < self._y_tab_max:
+            return self._rho_table(y)
+
+        # Fora da tabela (ex: um pouco abaixo do solo no último passo): usa as fórmulas
+        dentro = (y >= 0) & (y < self._y_tab_max)
+        out = self.rho_exact(y)
+        out[dentro] = self._rho_table(y[dentro])
+        return out
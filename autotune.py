@@ -0,0 +1,259 @@
+#autotune.py
+
+# Escolha automática do integrador e das tolerâncias para um cenário
+# O solve usa por padrão Radau com rtol = 1e-6 e atol = 1e-8, escolhido na tentativa e erro para o pior caso (ver comentários em Solver.solve)
+# Para um cenário concreto, um método explícito ou o LSODA com tolerâncias mais frouxas costuma dar a mesma resposta bem mais rápido
+
+# Calibração:
+#   - uma referência com tolerâncias bem apertadas (integração por fases, DOP853, 1e-12)
+#   - cada candidato (modo x método x tolerância) é cronometrado e comparado com a referência no ponto de pouso,
+#     na velocidade de impacto e nos instantes de abertura
+#   - em cada método as tolerâncias vão da mais frouxa para a mais apertada; uma tolerância só é aceita se a seguinte
+#     também cumprir o orçamento (o erro nem sempre cai de forma monótona, e um acerto por sorte não conta)
+#   - fica o candidato aceito mais rápido
+#   - os candidatos rodam com as mesmas opções de saída do uso real (grade de dt ou dense = True), que também pesam no tempo
+# O resultado fica guardado em PATH_RESULTADOS/autotune.json pela impressão digital da configuração (SimConfig.digest),
+# do vento, do orçamento e das opções de saída, então cada cenário só é calibrado uma vez (alguns segundos)
+
+# Exemplos:
+#   solver.solve(method='auto', dense=True)                       (orçamento padrão, ver ORCAMENTO)
+#   ajuste = tune(solver.config, {'x_final': 0.1}, opcoes={'dense': True})
+#   run(solver, ajuste, dense=True)
+#   python autotune.py --set AREA_MAIN=4 --orcamento x_final=0.1
+
+import argparse
+import inspect
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from cache import ResultCache
+from config import PATH_RESULTADOS
+from simconfig import SimConfig
+from solver import Solver
+
+# Erro máximo aceito em relação à referência (padrão)
+#   x_final     ponto de pouso [m]
+#   v_impacto   velocidade de impacto [m/s]
+#   aberturas   maior erro entre os instantes de abertura [s]
+ORCAMENTO = {'x_final': 0.5, 'v_impacto': 0.01, 'aberturas': 0.01}
+
+# Candidatos: modos de integração, métodos e (rtol, atol), da mais frouxa para a mais apertada (atol = rtol/100, como o par padrão)
+MODOS = ('solve', 'segmented')
+METODOS = ('RK45', 'DOP853', 'Radau', 'LSODA')
+TOLERANCIAS = ((1e-3, 1e-5), (1e-4, 1e-6), (1e-5, 1e-7), (1e-6, 1e-8), (1e-7, 1e-9), (1e-8, 1e-10))
+
+REFERENCIA = {'modo': 'segmented', 'method': 'DOP853', 'rtol': 1e-12, 'atol': 1e-12}
+
+# Opções de saída usadas na calibração quando nada é informado
+OPCOES = {'dense': True}
+
+# Argumentos do solve que definem a saída (e portanto o trabalho medido na calibração)
+SAIDA = ('dt', 't_max', 'jac', 'dense')
+
+# Ajustes já calibrados neste processo {chave: resultado} (evita ler o arquivo a cada Solver de uma varredura)
+_AJUSTES = {}
+
+def run(solver, ajuste, **opcoes):
+    # Resolve com um ajuste {'modo', 'method', 'rtol', 'atol'}; opcoes: os demais argumentos do solve (dt, dense, cache, ...)
+    resolver = solver.solve if ajuste['modo'] == 'solve' else solver.solve_segmented
+    return resolver(method=ajuste['method'], rtol=ajuste['rtol'], atol=ajuste['atol'], **opcoes)
+
+def _workload(opcoes):
+    # Opções de saída que definem o trabalho de cada solução, completadas com os padrões do solve
+    # Chamadas equivalentes (ex: {'dense': True} e {'dense': True, 't_max': 1000}) dão a mesma chave
+    # O resto (cache, método, tolerâncias) não entra; com dense = True, dt não é usado
+    padrao = {nome: parametro.default for nome, parametro in inspect.signature(Solver.solve).parameters.items() if nome in SAIDA}
+    opcoes = {**padrao, **OPCOES, **(opcoes or {})}
+    opcoes = {nome: opcoes[nome] for nome in SAIDA}
+    if opcoes['dense']:
+        opcoes.pop('dt', None)
+    return opcoes
+
+def errors(solver, referencia):
+    # Erros da última solução do solver em relação à do Solver de referência: {nome do orçamento: erro}
+    # Uma solução que não chegou ao solo (ou com aberturas diferentes) tem erro infinito
+
+    if not solver.sol.success or not len(solver.sol.t_events[0]):
+        return {nome: np.inf for nome in ORCAMENTO}
+
+    resumo, resumo_ref = solver.summary(), referencia.summary()
+    aberturas, aberturas_ref = solver.deployment_times(), referencia.deployment_times()
+    if set(aberturas) != set(aberturas_ref):
+        erro_aberturas = np.inf
+    else:
+        erro_aberturas = max((abs(aberturas[nome] - aberturas_ref[nome]) for nome in aberturas), default=0.0)
+
+    return {
+        'x_final': abs(resumo['x_final'] - resumo_ref['x_final']),
+        'v_impacto': abs(resumo['v_impacto'] - resumo_ref['v_impacto']),
+        'aberturas': erro_aberturas,
+    }
+
+def _measure(solvers, referencias, ajuste, repeticoes, opcoes):
+    # Tempo (soma, entre os cenários, do melhor tempo de cada um) e maior erro de um candidato em todos os cenários
+
+    tempo = 0.0
+    erros = dict.fromkeys(ORCAMENTO, 0.0)
+    for solver, referencia in zip(solvers, referencias):
+        melhor = np.inf
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            try:
+                with np.errstate(all='ignore'): # Tolerâncias frouxas às vezes estouram no meio; o erro final é que decide
+                    run(solver, ajuste, **opcoes)
+            except (ArithmeticError, ValueError): # Estourou de vez (ex: altitude absurda na atmosfera): candidato reprovado
+                return np.inf, dict.fromkeys(ORCAMENTO, np.inf)
+            melhor = min(melhor, time.perf_counter() - inicio)
+        tempo += melhor
+        for nome, erro in errors(solver, referencia).items():
+            erros[nome] = max(erros[nome], erro)
+    return tempo, erros
+
+def _within(erros, orcamento):
+    # Todos os erros dentro do orçamento (NaN não passa)
+    return all(erros[nome] <= limite for nome, limite in orcamento.items())
+
+def calibrate(configs, orcamento=None, repeticoes=3, wind=None, opcoes=None):
+    # Calibração completa (sem cache) para uma ou mais configurações: o ajuste escolhido precisa cumprir o orçamento em todas
+    # opcoes: opções de saída do solve com que o ajuste vai ser usado (dt, t_max, dense, jac); padrão: OPCOES
+    # Retorna {'ajuste': {...}, 'tempo': s, 'erros': {...}, 'candidatos': [cada candidato medido]}
+
+    if isinstance(configs, SimConfig):
+        configs = [configs]
+    orcamento = {**ORCAMENTO, **(orcamento or {})}
+    desconhecidos = [nome for nome in orcamento if nome not in ORCAMENTO]
+    if desconhecidos:
+        raise ValueError(f"Erro '{desconhecidos[0]}' desconhecido no orçamento. Use um de: {', '.join(ORCAMENTO)}.")
+
+    opcoes = _workload(opcoes)
+    solvers = [Solver(config, wind=wind) for config in configs]
+    referencias = [Solver(config, wind=wind) for config in configs]
+    for referencia in referencias:
+        run(referencia, REFERENCIA, dense=True)
+
+    candidatos = []
+    melhor = None
+    for modo in MODOS:
+        for metodo in METODOS:
+            aceito = None
+            for rtol, atol in TOLERANCIAS:
+                ajuste = {'modo': modo, 'method': metodo, 'rtol': rtol, 'atol': atol}
+                tempo, erros = _measure(solvers, referencias, ajuste, repeticoes, opcoes)
+                candidatos.append({**ajuste, 'tempo': tempo, 'erros': erros})
+
+                if _within(erros, orcamento):
+                    if aceito is not None: # Duas tolerâncias seguidas dentro do orçamento: fica a mais frouxa
+                        if melhor is None or aceito['tempo'] < melhor['tempo']:
+                            melhor = aceito
+                        break
+                    aceito = candidatos[-1]
+                else:
+                    aceito = None
+
+                # Tolerâncias mais apertadas só ficam mais caras: se este método já perde para o melhor, para por aqui
+                # (um candidato que estourou não tem tempo medido e não conta)
+                tempo_atual = (aceito or candidatos[-1])['tempo']
+                if melhor is not None and np.isfinite(tempo_atual) and tempo_atual > melhor['tempo']:
+                    break
+
+    if melhor is None:
+        raise ValueError(f"Nenhum candidato cumpre o orçamento {orcamento}.")
+
+    return {
+        'ajuste': {nome: melhor[nome] for nome in ('modo', 'method', 'rtol', 'atol')},
+        'tempo': melhor['tempo'],
+        'erros': melhor['erros'],
+        'candidatos': candidatos,
+    }
+
+def _key(configs, orcamento, wind, opcoes):
+    # Chave do ajuste: configurações, vento (conteúdo do perfil), orçamento, opções de saída e candidatos
+    descricao = {
+        'configs': sorted(config.digest() for config in configs),
+        'vento': wind.digest() if wind is not None else None,
+        'orcamento': {**ORCAMENTO, **(orcamento or {})},
+        'opcoes': _workload(opcoes),
+        'candidatos': [MODOS, METODOS, TOLERANCIAS, REFERENCIA],
+    }
+    return ResultCache.key(descricao)
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _write(path, ajustes):
+    # Escrita atômica (arquivo temporário + os.replace): outro processo nunca lê o arquivo pela metade
+    # Dois processos calibrando ao mesmo tempo podem perder um ajuste, que só é calibrado de novo
+    pasta = os.path.dirname(path) or '.'
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(ajustes, f, indent=2)
+    os.replace(temporario, path)
+
+def _tune(configs, orcamento, path, wind, force, repeticoes, opcoes):
+    # Resultado completo da calibração (ver calibrate), do cache deste processo, do arquivo ou calibrado agora
+
+    if configs is None:
+        configs = SimConfig()
+    if isinstance(configs, SimConfig):
+        configs = [configs]
+    if wind is None:
+        wind = Solver(configs[0]).wind # Perfil do PERFIL_VENTO (o conteúdo entra na chave)
+    path = path or os.path.join(PATH_RESULTADOS, 'autotune.json')
+
+    key = _key(configs, orcamento, wind, opcoes)
+    if not force:
+        if key in _AJUSTES:
+            return _AJUSTES[key]
+        guardado = _read(path).get(key)
+        if guardado is not None:
+            _AJUSTES[key] = guardado
+            return guardado
+
+    resultado = calibrate(configs, orcamento, repeticoes, wind, opcoes)
+    resultado['data'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    _AJUSTES[key] = resultado
+
+    ajustes = _read(path)
+    ajustes[key] = resultado
+    _write(path, ajustes)
+    return resultado
+
+def tune(configs=None, orcamento=None, path=None, wind=None, force=False, repeticoes=3, opcoes=None):
+    # Ajuste {'modo', 'method', 'rtol', 'atol'} mais rápido que cumpre o orçamento, calibrado só na primeira vez
+    # configs: SimConfig ou lista (ex: alguns pontos de uma varredura); None usa o config.py
+    # orcamento: {nome: erro máximo} (os que faltarem vêm de ORCAMENTO); force = True calibra de novo
+    # opcoes: opções de saída com que o ajuste vai ser usado (ex: {'dense': False, 'dt': 0.001}, a grade padrão do solve)
+    return dict(_tune(configs, orcamento, path, wind, force, repeticoes, opcoes)['ajuste'])
+
+if __name__ == "__main__":
+    from cli import _parse_set
+
+    parser = argparse.ArgumentParser(description="Calibra o integrador e as tolerâncias mais rápidos para um cenário")
+    parser.add_argument('--cenario', default=None, help="Arquivo de cenário (.json ou .toml, ver simconfig.py)")
+    parser.add_argument('--set', action='append', default=[], metavar='NOME=valor', help="Substitui um valor do config.py (ou do cenário)")
+    parser.add_argument('--orcamento', action='append', default=[], metavar='NOME=erro', help=f"Erro máximo ({', '.join(ORCAMENTO)})")
+    parser.add_argument('--grade', action='store_true', help="Calibra com a grade de saída padrão do solve (dt = 0.001) em vez de dense = True")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções cronometradas por candidato (vale o melhor tempo)")
+    args = parser.parse_args()
+
+    config = SimConfig.load(args.cenario) if args.cenario else SimConfig()
+    config = config.replace(dict(_parse_set(texto) for texto in args.set))
+    orcamento = {nome: float(valor) for nome, valor in (texto.split('=', 1) for texto in args.orcamento)}
+
+    resultado = _tune(config, orcamento, None, None, True, args.repeticoes, {'dense': not args.grade}) # Sempre calibra (e guarda para os próximos solve(method='auto'))
+    for candidato in resultado['candidatos']:
+        erros = '  '.join(f"{nome}={erro:.2e}" for nome, erro in candidato['erros'].items())
+        print(f"{candidato['modo']:9s} {candidato['method']:6s} rtol={candidato['rtol']:.0e}  {candidato['tempo'] * 1e3:7.1f} ms  {erros}")
+
+    ajuste = resultado['ajuste']
+    print(f"Escolhido: {ajuste['modo']} {ajuste['method']} rtol={ajuste['rtol']:g} atol={ajuste['atol']:g} ({resultado['tempo'] * 1e3:.1f} ms)")
+
@@ -0,0 +1,288 @@
+#benchmark.py
+
+# Benchmarks do Solver (métodos, tolerâncias e caminhos do modelo), das funções do lado direito da EDO e do relatório
+# Cada execução grava uma linha JSON no histórico (Results/benchmarks.jsonl) e compare aponta o que piorou em relação a uma execução anterior
+
+# Para cada caso são medidos:
+#   tempo        melhor tempo de parede entre as repetições [s] (micro-benchmarks: tempo por chamada)
+#   nfev         avaliações do lado direito da EDO
+#   memoria      pico de memória alocada pelo Python/NumPy durante o caso (tracemalloc) [bytes], numa execução separada da cronometrada
+#   erro_pouso   |x de pouso - x de referência| [m], com a referência integrada com tolerâncias bem apertadas
+
+# Exemplos:
+#   python benchmark.py run
+#   python benchmark.py run --rapido --filtro Radau
+#   python benchmark.py compare --limite 0.15
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+
+from config import PATH_RESULTADOS
+from solver import Solver
+
+METODOS = ('RK45', 'DOP853', 'Radau', 'BDF', 'LSODA')
+
+# (rtol, atol) testados em cada método
+TOLERANCIAS = ((1e-4, 1e-6), (1e-6, 1e-8), (1e-8, 1e-10))
+TOLERANCIAS_RAPIDO = ((1e-6, 1e-8),)
+
+# Referência para o erro do ponto de pouso: integração por fases com DOP853 e tolerâncias apertadas
+REFERENCIA = {'method': 'DOP853', 'rtol': 1e-12, 'atol': 1e-12}
+
+# Métricas comparadas por compare (maior = pior em todas)
+METRICAS = ('tempo', 'nfev', 'memoria', 'erro_pouso')
+
+# Abaixo disso o erro do pouso é considerado ruído e não conta como regressão [m]
+ERRO_MINIMO = 1e-6
+
+def _pouso(solver):
+    # x do ponto de pouso (evento y = 0) da última solução
+    return float(solver.sol.y_events[0][0][2])
+
+def _medir(funcao, repeticoes):
+    # Melhor tempo de parede entre as repetições e pico de memória (tracemalloc) numa execução extra
+    # funcao() retorna o Solver usado (ou None); o último retorno vai para as métricas do caso
+
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(tempos), pico, resultado
+
+def _micro(funcao, n):
+    # Tempo médio por chamada de funcao() [s], no melhor de 3 blocos de n chamadas
+    melhor = float('inf')
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(n):
+            funcao()
+        melhor = min(melhor, (time.perf_counter() - inicio) / n)
+    return melhor
+
+def cases(rapido=False):
+    # Lista de casos: (nome, tipo, opções)
+    tolerancias = TOLERANCIAS_RAPIDO if rapido else TOLERANCIAS
+
+    casos = []
+    for metodo in METODOS:
+        for rtol, atol in tolerancias:
+            casos.append((f"solve/{metodo}/rtol={rtol:g}", 'solve', {'method': metodo, 'rtol': rtol, 'atol': atol, 'dense': True}))
+
+    # Caminhos alternativos do modelo
+    casos.append(("solve/Radau/padrao", 'solve', {})) # Como o main.py chama (grade de saída com dt = 0.001)
+    casos.append(("solve/auto", 'solve', {'method': 'auto', 'dense': True})) # Ajuste calibrado para o config.py (ver autotune.py)
+    casos.append(("solve/Radau/sem_jacobiana", 'solve', {'method': 'Radau', 'jac': False, 'dense': True}))
+    casos.append(("solve_segmented/RK45", 'segmented', {'method': 'RK45', 'dt': 1000}))
+    casos.append(("solve_segmented/DOP853", 'segmented', {'method': 'DOP853', 'dt': 1000}))
+    casos.append(("solve/terminal", 'solve', {'method': 'terminal'}))
+    casos.append(("solve_ensemble/1000", 'ensemble', {'n': 1000}))
+
+    # Micro-benchmarks do lado direito da EDO
+    casos.append(("micro/rho", 'micro', {'funcao': 'rho'}))
+    casos.append(("micro/F_drag", 'micro', {'funcao': 'F_drag'}))
+    casos.append(("micro/dSdt", 'micro', {'funcao': 'dSdt'}))
+
+    casos.append(("generate_report", 'report', {}))
+    casos.append(("generate_report/sem_mudancas", 'report', {'incremental': True}))
+    return casos
+
+def reference():
+    # x do ponto de pouso de referência
+    solver = Solver()
+    solver.solve_segmented(dt=1000, **REFERENCIA)
+    return _pouso(solver)
+
+def run_case(tipo, opcoes, x_ref, repeticoes=3):
+    # Roda um caso e retorna suas métricas
+
+    if tipo == 'micro':
+        solver = Solver()
+        S = np.array([solver.ym / 2, -20.0, 10.0, 3.0])
+        funcao = {
+            'rho': lambda: solver.rho(S[0]),
+            'F_drag': lambda: solver.F_drag(S),
+            'dSdt': lambda: solver.dSdt(S),
+        }[opcoes['funcao']]
+        return {'tempo': _micro(funcao, 20000)}
+
+    if tipo == 'ensemble':
+        def funcao():
+            solver = Solver()
+            solver.solve_ensemble(n=opcoes['n'])
+            return solver
+        tempo, memoria, solver = _medir(funcao, repeticoes)
+        # Todos os membros são iguais (sem dispersão): o erro é o de um membro
+        return {'tempo': tempo, 'memoria': memoria, 'erro_pouso': abs(float(solver.ensemble['x_final'][0]) - x_ref)}
+
+    if tipo == 'report':
+        from visualizer import Visualizer # Só importa o matplotlib quando o caso roda
+
+        solver = Solver()
+        solver.solve(dense=True)
+        with tempfile.TemporaryDirectory() as pasta:
+            # Sem 'incremental', todas as figuras são redesenhadas; com ele, mede o relatório de um cenário que não mudou
+            incremental = opcoes.get('incremental', False)
+            def funcao():
+                visualizer = Visualizer()
+                visualizer.results_dir = pasta
+                visualizer.load_solution(solver)
+                visualizer.generate_report(workers=1, force=not incremental)
+            if incremental:
+                funcao()
+            tempo, memoria, _ = _medir(funcao, repeticoes)
+        return {'tempo': tempo, 'memoria': memoria}
+
+    if opcoes.get('method') == 'auto':
+        from autotune import tune
+        tune(opcoes=opcoes) # Calibra (ou lê o ajuste guardado) para as mesmas opções de saída do caso antes de cronometrar
+
+    def funcao():
+        solver = Solver()
+        if tipo == 'segmented':
+            solver.solve_segmented(**opcoes)
+        else:
+            solver.solve(**opcoes)
+        return solver
+
+    tempo, memoria, solver = _medir(funcao, repeticoes)
+    return {'tempo': tempo, 'nfev': int(solver.sol.nfev), 'memoria': memoria, 'erro_pouso': abs(_pouso(solver) - x_ref)}
+
+def _commit():
+    # Commit atual do git (se houver), para identificar a execução no histórico
+    try:
+        saida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return saida.stdout.strip() or None
+
+def run(path=None, rapido=False, filtro=None, repeticoes=3):
+    # Roda todos os casos (ou os que contêm filtro no nome) e acrescenta a execução ao histórico
+    # Retorna o registro gravado
+
+    if path is None:
+        path = os.path.join(PATH_RESULTADOS, "benchmarks.jsonl")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    x_ref = reference()
+    print(f"Referência ({REFERENCIA['method']}, rtol={REFERENCIA['rtol']:g}): x de pouso = {x_ref:.6f} m")
+
+    resultados = {}
+    for nome, tipo, opcoes in cases(rapido):
+        if filtro and filtro not in nome:
+            continue
+        resultados[nome] = run_case(tipo, opcoes, x_ref, repeticoes)
+        print(f"{nome:40s} {_formatar(resultados[nome])}")
+
+    registro = {
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'maquina': platform.node(),
+        'x_referencia': x_ref,
+        'casos': resultados,
+    }
+    with open(path, 'a') as f:
+        f.write(json.dumps(registro) + '\n')
+
+    print(f"Resultados em: {path}")
+    return registro
+
+def _formatar(metricas):
+    # Métricas de um caso em uma linha
+    partes = []
+    if 'tempo' in metricas:
+        t = metricas['tempo']
+        partes.append(f"tempo={t * 1e6:.2f}µs" if t < 1e-3 else f"tempo={t:.4f}s")
+    if 'nfev' in metricas:
+        partes.append(f"nfev={metricas['nfev']}")
+    if 'memoria' in metricas:
+        partes.append(f"memoria={metricas['memoria'] / 1e6:.1f}MB")
+    if 'erro_pouso' in metricas:
+        partes.append(f"erro_pouso={metricas['erro_pouso']:.2e}m")
+    return '  '.join(partes)
+
+def load_history(path=None):
+    # Todas as execuções gravadas no histórico, da mais antiga para a mais nova
+    if path is None:
+        path = os.path.join(PATH_RESULTADOS, "benchmarks.jsonl")
+    with open(path) as f:
+        return [json.loads(linha) for linha in f if linha.strip()]
+
+def compare(base, atual, limite=0.1):
+    # Compara duas execuções (registros do histórico) caso a caso
+    # Uma métrica é regressão se piorou mais que limite (relativo); o erro do pouso só conta acima de ERRO_MINIMO
+    # Retorna [(caso, métrica, valor base, valor atual, variação relativa, regressão)]
+
+    linhas = []
+    for nome, metricas in atual['casos'].items():
+        if nome not in base['casos']:
+            continue
+        for metrica in METRICAS:
+            if metrica not in metricas or metrica not in base['casos'][nome]:
+                continue
+            antes, depois = base['casos'][nome][metrica], metricas[metrica]
+            variacao = (depois - antes) / antes if antes else (0.0 if depois == antes else float('inf'))
+            regressao = variacao > limite
+            if metrica == 'erro_pouso':
+                regressao = regressao and depois > ERRO_MINIMO
+            linhas.append((nome, metrica, antes, depois, variacao, regressao))
+    return linhas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks do Solver e do relatório")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_run = comandos.add_parser('run', help="Roda os benchmarks e grava no histórico")
+    p_run.add_argument('--rapido', action='store_true', help="Só uma tolerância por método")
+    p_run.add_argument('--filtro', default=None, help="Só os casos que contêm este texto no nome")
+    p_run.add_argument('--repeticoes', type=int, default=3, help="Repetições cronometradas por caso (vale a melhor)")
+    p_run.add_argument('--historico', default=None, help="Arquivo JSONL do histórico")
+
+    p_compare = comandos.add_parser('compare', help="Compara a última execução com uma anterior")
+    p_compare.add_argument('--base', type=int, default=-2, help="Índice da execução base no histórico (padrão: a penúltima)")
+    p_compare.add_argument('--atual', type=int, default=-1, help="Índice da execução comparada (padrão: a última)")
+    p_compare.add_argument('--limite', type=float, default=0.1, help="Piora relativa tolerada (0.1 = 10%%)")
+    p_compare.add_argument('--historico', default=None, help="Arquivo JSONL do histórico")
+    args = parser.parse_args()
+
+    if args.comando == 'run':
+        run(args.historico, rapido=args.rapido, filtro=args.filtro, repeticoes=args.repeticoes)
+        sys.exit(0)
+
+    historico = load_history(args.historico)
+    if len(historico) < 2:
+        parser.error("O histórico precisa de pelo menos duas execuções.")
+    base, atual = historico[args.base], historico[args.atual]
+
+    print(f"Base:  {base['data']} ({base['commit']})")
+    print(f"Atual: {atual['data']} ({atual['commit']})")
+
+    linhas = compare(base, atual, args.limite)
+    for nome, metrica, antes, depois, variacao, regressao in linhas:
+        marca = "REGRESSÃO" if regressao else ""
+        print(f"{nome:40s} {metrica:12s} {antes:12.4g} --> {depois:12.4g} ({variacao:+7.1%}) {marca}")
+
+    regressoes = [linha for linha in linhas if linha[5]]
+    print(f"{len(regressoes)} regressões acima de {args.limite:.0%}")
+    sys.exit(1 if regressoes else 0)
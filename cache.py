@@ -0,0 +1,151 @@
+#cache.py
+
+# Cache de resultados do Solver em disco, endereçado pelo conteúdo
+# A chave é um hash SHA-256 de tudo que define a solução: parâmetros físicos, método, tolerâncias, grade de saída e o código do modelo
+# Cada entrada é um arquivo .npz em PATH_RESULTADOS/cache; o tamanho total é limitado e as entradas menos usadas saem primeiro (LRU pelo mtime)
+
+# Vários processos podem usar o mesmo cache ao mesmo tempo (ex: workers do sweep.py):
+#   - cada entrada é escrita num arquivo temporário e renomeada com os.replace (atômico), então ninguém lê uma entrada pela metade
+#   - remoções concorrentes são toleradas (uma entrada que sumiu é só um miss)
+#   - os contadores de acertos/erros acumulados ficam num JSON atualizado com trava de arquivo (fcntl)
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import PATH_RESULTADOS
+
+class ResultCache:
+    def __init__(self, path=None, max_bytes=500_000_000):
+        # path: pasta do cache (padrão: PATH_RESULTADOS/cache)
+        # max_bytes: tamanho máximo somado das entradas
+        self.path = path or os.path.join(PATH_RESULTADOS, 'cache')
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+        # Contadores deste processo (os acumulados de todos os processos estão em stats())
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(descricao):
+        # Hash de um dicionário serializável em JSON (a ordem das chaves não importa)
+        texto = json.dumps(descricao, sort_keys=True, default=float)
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+    def _arquivo(self, key):
+        return os.path.join(self.path, key + '.npz')
+
+    @contextmanager
+    def _trava(self):
+        # Trava exclusiva entre processos para o arquivo de contadores
+        with open(os.path.join(self.path, '.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _contar(self, campo):
+        # Soma 1 no contador acumulado (hits ou misses)
+        arquivo = os.path.join(self.path, 'stats.json')
+        with self._trava():
+            try:
+                with open(arquivo) as f:
+                    contadores = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                contadores = {'hits': 0, 'misses': 0}
+            contadores[campo] += 1
+            with open(arquivo, 'w') as f:
+                json.dump(contadores, f)
+
+    def get(self, key):
+        # Entrada guardada ({nome: array}) ou None
+
+        try:
+            with np.load(self._arquivo(key)) as dados:
+                entrada = {nome: dados[nome] for nome in dados.files}
+            os.utime(self._arquivo(key)) # Marca como usada agora (LRU)
+        except (FileNotFoundError, OSError, ValueError):
+            self.misses += 1
+            self._contar('misses')
+            return None
+
+        self.hits += 1
+        self._contar('hits')
+        return entrada
+
+    def put(self, key, entrada):
+        # Guarda uma entrada ({nome: array}) e remove as mais antigas se passar do limite
+
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **entrada)
+            os.replace(tmp, self._arquivo(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        self.evict()
+
+    def _entradas(self):
+        # [(mtime, tamanho, caminho)] de todas as entradas
+        entradas = []
+        for nome in os.listdir(self.path):
+            if not nome.endswith('.npz'):
+                continue
+            caminho = os.path.join(self.path, nome)
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue # Removida por outro processo
+            entradas.append((info.st_mtime, info.st_size, caminho))
+        return entradas
+
+    def evict(self):
+        # Remove as entradas usadas há mais tempo até o total caber em max_bytes
+
+        entradas = sorted(self._entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+
+        for _, tamanho, caminho in entradas:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def clear(self):
+        # Remove todas as entradas
+        for _, _, caminho in self._entradas():
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        # Contadores acumulados (todos os processos) e deste processo, número de entradas e tamanho total
+        try:
+            with open(os.path.join(self.path, 'stats.json')) as f:
+                contadores = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            contadores = {'hits': 0, 'misses': 0}
+
+        entradas = self._entradas()
+        return {
+            'hits': contadores['hits'],
+            'misses': contadores['misses'],
+            'hits_processo': self.hits,
+            'misses_processo': self.misses,
+            'entradas': len(entradas),
+            'bytes': sum(tamanho for _, tamanho, _ in entradas),
+        }
@@ -0,0 +1,104 @@
+#cli.py
+
+# Linha de comando leve: roda o Solver e mostra os principais resultados em JSON ou CSV, sem gráficos
+# O matplotlib (e o scienceplots) só é importado se o relatório for pedido com --relatorio,
+# então a partida é bem mais rápida que a do main.py, que sempre carrega o visualizer
+
+# Exemplos:
+#   python cli.py
+#   python cli.py --set ALTURA_ABERTURA_MAIN=700 --set AREA_MAIN=4 --modo segmented --metodo RK45
+#   python cli.py --set MODELO_ATMOSFERA=tabela --formato csv --saida resultado.csv
+#   python cli.py --relatorio
+#   python cli.py --cenario cenario.toml --set AREA_MAIN=5
+
+import argparse
+import csv
+import json
+import sys
+
+from simconfig import SimConfig
+from solver import Solver
+
+def results(solver):
+    # Principais resultados da última solução: tempo de voo, deriva, velocidades máxima e de impacto e instantes de abertura
+    # Paraquedas que não abrem (altitude de abertura acima do apogeu) ficam com None
+
+    resumo = solver.summary()
+    S_solo = solver.sol.y_events[0][0] if len(solver.sol.y_events[0]) else solver.sol.y[:, -1]
+    aberturas = solver.deployment_times()
+
+    return {
+        't_voo': resumo['t_voo'],
+        'x_final': resumo['x_final'],
+        'v_max': resumo['v_max'],
+        'v_impacto': resumo['v_impacto'],
+        'vx_impacto': float(S_solo[3]),
+        'vy_impacto': float(S_solo[1]),
+        't_drogue': aberturas.get('drogue'),
+        't_reefing': aberturas.get('reefing'),
+        't_main': aberturas.get('main'),
+    }
+
+def _parse_set(texto):
+    # NOME=valor --> (NOME, valor); o valor é lido como JSON (números, null, true/false) ou fica como texto
+    nome, valor = texto.split('=', 1)
+    try:
+        return nome, json.loads(valor)
+    except json.JSONDecodeError:
+        return nome, valor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roda o Solver e mostra os principais resultados (sem gráficos)")
+    parser.add_argument('--cenario', default=None, help="Arquivo de cenário (.json ou .toml, ver simconfig.py) com os valores base")
+    parser.add_argument('--set', action='append', default=[], metavar='NOME=valor', help="Substitui um valor do config.py (ou do cenário)")
+    parser.add_argument('--modo', default='solve', choices=('solve', 'segmented', 'terminal'), help="Integração completa, por fases ou modelo terminal")
+    parser.add_argument('--metodo', default=None, help="Método do solve_ivp (padrão: Radau no solve, RK45 no segmented); no solve, 'auto' calibra o mais rápido (ver autotune.py)")
+    parser.add_argument('--rtol', type=float, default=1e-6)
+    parser.add_argument('--atol', type=float, default=1e-8)
+    parser.add_argument('--cache', action='store_true', help="Usa o cache de resultados (ver cache.py)")
+    parser.add_argument('--formato', default='json', choices=('json', 'csv'))
+    parser.add_argument('--saida', default=None, help="Arquivo de saída (padrão: saída padrão)")
+    parser.add_argument('--relatorio', action='store_true', help="Gera também o relatório com as figuras (carrega o matplotlib)")
+    args = parser.parse_args(argv)
+    if args.metodo == 'auto' and args.modo != 'solve':
+        parser.error("--metodo auto só vale com --modo solve (a calibração já escolhe entre a integração completa e por fases).")
+
+    config = SimConfig.load(args.cenario) if args.cenario else SimConfig()
+    overrides = dict(_parse_set(texto) for texto in args.set)
+    solver = Solver(overrides, config=config)
+
+    if args.modo == 'terminal':
+        solver.solve_terminal()
+    else:
+        # Sem grade de saída: só os passos aceitos (dense = True), que bastam para os números e para o relatório
+        opcoes = {'rtol': args.rtol, 'atol': args.atol, 'dense': True}
+        if args.metodo:
+            opcoes['method'] = args.metodo
+        if args.cache:
+            from cache import ResultCache
+            opcoes['cache'] = ResultCache()
+        (solver.solve if args.modo == 'solve' else solver.solve_segmented)(**opcoes)
+
+    resultado = results(solver)
+
+    if args.relatorio:
+        from visualizer import Visualizer # Só aqui o matplotlib é carregado
+        visualizer = Visualizer(config=solver.config) # Com as substituições do --set (a pasta de resultados inclusive)
+        visualizer.load_solution(solver)
+        resultado['relatorio'] = visualizer.generate_report()
+
+    saida = open(args.saida, 'w', newline='') if args.saida else sys.stdout
+    try:
+        if args.formato == 'json':
+            json.dump(resultado, saida, indent=2)
+            saida.write('\n')
+        else:
+            escritor = csv.DictWriter(saida, fieldnames=list(resultado))
+            escritor.writeheader()
+            escritor.writerow(resultado)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,12 @@ CD_MAIN = 0.75
 AREA_BASE_FOGUETE = 0.1
 CD_FOGUETE = 0.5
 
+#Inflação dos paraquedas: distância vertical [m] percorrida enquanto o paraquedas enche, depois da altitude de abertura
+#cd*A cresce de forma suave (sem salto) de zero até o valor cheio ao longo dessa distância; 0 = abertura instantânea
+DISTANCIA_INFLACAO_DROGUE = 0
+DISTANCIA_INFLACAO_REEFING = 0
+DISTANCIA_INFLACAO_MAIN = 0
+
 
 ################## Simulador ####################
 
@@ -34,6 +40,7 @@ ACELERACAO_GRAVITACIONAL = 9.8
 #Vento
 VELOCIDADE_VENTO_HORIZONTAL = 13/3.6
 VELOCIDADE_VENTO_VERTICAL = 0
+PERFIL_VENTO = None                         # Arquivo com o vento em função da altitude (ver wind.py); se definido, substitui as velocidades constantes acima
 
 #Parâmetros para cálculos de densidade do ar
 CONSTANTE_UNIVERSAL_GASES = 8.3144598       # Constante universal dos gases [J/(mol·K)]
@@ -43,4 +50,7 @@ GRADIENTE_TERMICO_ESTRATOSFERICO = 0.001    # Gradiente térmico estratosférico
 TEMPERATURA_SOLO = 295.15                   # Temperatura no solo (y = 0) [K]                           (NÃO É NO NÍVEL DO MAR !!!)
 PRESSAO_SOLO = 92000                        # Pressão no solo (y = 0) [Pa]                               (NÃO É NO NÍVEL DO MAR !!!)
 ALTURA_SOLO = 856                           # Altitude do solo (y = 0) em relação ao nível do mar       (É NO NÍVEL DO MAR !!!)
-     
\ No newline at end of file
+
+#Modelo de atmosfera
+MODELO_ATMOSFERA = 'exato'                  # 'exato' (fórmulas das camadas) ou 'tabela' (interpolação numa tabela pré-calculada)
+PASSO_TABELA_ATMOSFERA = 1.0                # Passo da tabela de densidade [m] (erro relativo máximo ~3e-9 com 1 m)
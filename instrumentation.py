@@ -0,0 +1,81 @@
+#instrumentation.py
+
+# Instrumentação opcional do Solver e do Visualizer: onde o tempo de uma execução está sendo gasto
+# Um único objeto Stats guarda:
+#   calls   número de chamadas das funções do lado direito da EDO (dSdt, F_drag, rho, ...)
+#   phases  tempo de integração em cada fase do voo (balística, drogue, reefing, main)
+#   stages  tempo de cada etapa (integração, cache, séries, figuras, relatório, ...)
+
+# O custo com a instrumentação ligada é de um incremento de contador por chamada e de um relógio só quando a fase muda
+# Com ela desligada (padrão) nada é medido e o código não passa por aqui
+
+import time
+from contextlib import contextmanager
+
+class Stats:
+    def __init__(self):
+        self.calls = {}
+        self.phases = {}
+        self.stages = {}
+
+        # A última solução veio do cache (sem integração, então sem chamadas nem fases para mostrar)
+        self.from_cache = False
+
+        # Etapa em andamento e fase do voo em andamento (None fora da integração) e instante em que começou
+        self.current_stage = None
+        self.current_phase = None
+        self._inicio_fase = 0.0
+
+    def enter_phase(self, nome):
+        # Fecha a fase atual (soma o tempo dela) e começa a contar a fase nome
+        agora = time.perf_counter()
+        if self.current_phase is not None:
+            self.phases[self.current_phase] = self.phases.get(self.current_phase, 0.0) + agora - self._inicio_fase
+        self.current_phase = nome
+        self._inicio_fase = agora
+
+    def end_phase(self):
+        # Fecha a fase atual, se houver
+        if self.current_phase is not None:
+            self.enter_phase(None)
+
+    @contextmanager
+    def stage(self, nome):
+        # Cronometra um bloco de código e soma o tempo na etapa nome (ao sair, fecha a fase do voo em andamento)
+        anterior, self.current_stage = self.current_stage, nome
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.end_phase()
+            self.stages[nome] = self.stages.get(nome, 0.0) + time.perf_counter() - inicio
+            self.current_stage = anterior
+
+    def markdown(self):
+        # Seção de desempenho para o relatório
+        linhas = ["## Desempenho", ""]
+
+        if self.from_cache:
+            linhas += ["Solução: resultado do cache (nenhuma integração nesta execução).", ""]
+
+        if self.stages:
+            linhas += ["### Etapas", "", "| Etapa | Tempo (s) |", "|---|---|"]
+            linhas += [f"| {nome} | {tempo:.4f} |" for nome, tempo in self.stages.items()]
+            linhas.append("")
+
+        if self.phases and not self.from_cache:
+            total = sum(self.phases.values())
+            linhas += ["### Integração por fase do voo", "", "| Fase | Tempo (s) | Fração |", "|---|---|---|"]
+            linhas += [f"| {nome} | {tempo:.4f} | {tempo / total:.1%} |" for nome, tempo in self.phases.items()]
+            linhas.append("")
+
+        chamadas = {nome: n for nome, n in self.calls.items() if n or not self.from_cache}
+        if chamadas:
+            linhas += ["### Chamadas", "", "| Função | Chamadas |", "|---|---|"]
+            linhas += [f"| {nome} | {n} |" for nome, n in chamadas.items()]
+            linhas.append("")
+
+        if len(linhas) == 2 + 2 * self.from_cache:
+            linhas += ["Nenhuma medida registrada.", ""]
+
+        return "\n".join(linhas)
@@ -2,15 +2,18 @@
 
 from solver import Solver
 from visualizer import Visualizer
+from cache import ResultCache
+from instrumentation import Stats
 
 if __name__ == "__main__":
-   # Criar e resolver o modelo
-    solver = Solver()
-    solver.solve()
+   # Criar e resolver o modelo (reaproveita a solução do cache se o config.py não mudou)
+    # Stats mede chamadas e tempos de cada etapa; o resumo vai para a seção de desempenho do relatório
+    solver = Solver(stats=Stats())
+    solver.solve(cache=ResultCache())
 
     # Carregar no visualizador e gerar relatório
     visualizer = Visualizer()
     visualizer.load_solution(solver)
-    report_path = visualizer.generate_report(generate_animation=False) # A animação não funciona por enquanto
+    report_path = visualizer.generate_report(generate_animation=False) # Use generate_animation=True para gravar também a animação
 
     print(f"Relatório gerado em: {report_path}")
\ No newline at end of file
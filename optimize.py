@@ -0,0 +1,273 @@
+#optimize.py
+
+# Otimização das altitudes de abertura e dos paraquedas (áreas, coeficientes de arrasto) com restrições de
+# velocidade de impacto, deriva e tempo de descida, retornando o conjunto de Pareto das configurações viáveis
+
+# Busca evolutiva multiobjetivo (no estilo do NSGA-II):
+#   - a população inicial vem de um hipercubo latino sobre os limites de cada parâmetro
+#   - cada geração é avaliada de uma vez como um ensemble do Solver (RK4 vetorizado, um membro por candidato)
+#   - pais e filhos são ordenados por frentes de Pareto (os viáveis antes, os inviáveis pela violação das restrições)
+#     e, dentro de cada frente, pela distância de aglomeração, para manter o conjunto espalhado
+#   - os filhos saem de cruzamento por mistura e mutação gaussiana dentro dos limites
+
+# Acima da maior altitude de abertura possível o voo é o mesmo para todos os candidatos (só o foguete, sem paraquedas)
+# Esse trecho balístico é integrado uma única vez e todas as gerações começam a partir do estado no fim dele
+
+# Exemplo:
+#   python optimize.py --param ALTURA_ABERTURA_MAIN=300:900 --param AREA_MAIN=2:6 --v-impacto-max 7 --deriva-max 2500
+
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from config import PATH_RESULTADOS
+from solver import Solver
+from sweep import latin_hypercube
+
+# Parâmetros que podem ser otimizados (nome no config.py) --> eles não mudam o voo acima da primeira abertura
+PARAMETROS_OTIMIZAVEIS = (
+    'ALTURA_ABERTURA_DROGUE',
+    'ALTURA_ABERTURA_REEFING',
+    'ALTURA_ABERTURA_MAIN',
+    'AREA_DROGUE',
+    'CD_DROGUE',
+    'AREA_REEFING',
+    'CD_REEFING',
+    'AREA_MAIN',
+    'CD_MAIN',
+)
+
+# Objetivos possíveis (todos minimizados)
+OBJETIVOS = ('v_impacto', 'deriva', 't_voo')
+
+ALTURAS = ('ALTURA_ABERTURA_DROGUE', 'ALTURA_ABERTURA_REEFING', 'ALTURA_ABERTURA_MAIN')
+
+def ballistic_prefix(solver, y_topo):
+    # Estado e instante em que o foguete, sem nenhum paraquedas, passa por y_topo: (t0, S0)
+    # Usa uma cópia do Solver com as aberturas abaixo do solo e a integração por fases com tolerâncias apertadas
+
+    if y_topo >= solver.ap:
+        return 0.0, np.array([solver.ap, 0, 0, 0], dtype=float)
+
+    balistico = Solver(solver.config, wind=solver.wind)
+    balistico.yd = balistico.yr = balistico.ym = -1.0
+    balistico.solve_segmented(method='DOP853', rtol=1e-10, atol=1e-10, dense=True)
+
+    estado = balistico.trajectory.at_altitude(y_topo)
+    S0 = estado.y[:, 0].copy()
+    S0[0] = y_topo
+    return float(estado.t[0]), S0
+
+def evaluate(solver, nomes, X, S0, t0, **ensemble_kwargs):
+    # Avalia uma população de candidatos (X: (n, d), colunas na ordem de nomes) num único ensemble
+    # Retorna {saída: array de tamanho n} com t_voo, x_final, deriva e v_impacto
+
+    params = {Solver.CONFIG_ATTRS[nome]: X[:, j] for j, nome in enumerate(nomes)}
+    r = solver.solve_ensemble(params, n=len(X), S0=S0, t0=t0, **ensemble_kwargs)
+    return {
+        't_voo': r['t_voo'],
+        'x_final': r['x_final'],
+        'deriva': np.abs(r['x_final']),
+        'v_impacto': r['v_impacto'],
+    }
+
+def violation(solver, nomes, X, resultado, restricoes):
+    # Violação total das restrições de cada candidato (0 = viável), com cada termo normalizado pelo seu limite
+    # restricoes: {saída: valor máximo}; também exige drogue >= reefing >= main
+
+    v = np.zeros(len(X))
+    for saida, maximo in restricoes.items():
+        if maximo is not None:
+            v += np.maximum(np.nan_to_num(resultado[saida], nan=np.inf) - maximo, 0) / maximo
+
+    alturas = [X[:, nomes.index(nome)] if nome in nomes else np.full(len(X), getattr(solver, Solver.CONFIG_ATTRS[nome])) for nome in ALTURAS]
+    for acima, abaixo in zip(alturas[:-1], alturas[1:]):
+        v += np.maximum(abaixo - acima, 0) / solver.ap
+
+    return v + np.isnan(resultado['t_voo']) # Não chegou ao solo
+
+def pareto_ranks(F, v):
+    # Frente de cada candidato (0 = não dominado), com a dominância restrita:
+    # viável domina inviável, entre inviáveis vence a menor violação, entre viáveis vale a dominância de Pareto em F (n, m)
+
+    n = len(F)
+    melhor_ou_igual = np.all(F[:, None, :] <= F[None, :, :], axis=2)
+    melhor = np.any(F[:, None, :] < F[None, :, :], axis=2)
+    viavel = v == 0
+
+    domina = np.where(
+        viavel[:, None] & viavel[None, :],
+        melhor_ou_igual & melhor,
+        v[:, None] < v[None, :],
+    )
+
+    ranks = np.full(n, -1)
+    restantes = np.ones(n, dtype=bool)
+    frente = 0
+    while restantes.any():
+        # Não dominados por nenhum dos que ainda não foram classificados
+        atual = restantes & ~np.any(domina[restantes], axis=0)
+        ranks[atual] = frente
+        restantes &= ~atual
+        frente += 1
+    return ranks
+
+def crowding(F, ranks):
+    # Distância de aglomeração dentro de cada frente (extremos = infinito), com os objetivos normalizados
+    d = np.zeros(len(F))
+    for frente in np.unique(ranks):
+        idx = np.flatnonzero(ranks == frente)
+        if len(idx) <= 2:
+            d[idx] = np.inf
+            continue
+        for j in range(F.shape[1]):
+            ordem = idx[np.argsort(F[idx, j])]
+            escala = F[ordem[-1], j] - F[ordem[0], j]
+            d[ordem[0]] = d[ordem[-1]] = np.inf
+            if escala > 0:
+                d[ordem[1:-1]] += (F[ordem[2:], j] - F[ordem[:-2], j]) / escala
+    return d
+
+def _select(ranks, distancias, n, rng):
+    # Torneio binário: menor frente vence; empate, maior distância de aglomeração
+    a, b = rng.integers(len(ranks), size=(2, n))
+    a_vence = (ranks[a] < ranks[b]) | ((ranks[a] == ranks[b]) & (distancias[a] >= distancias[b]))
+    return np.where(a_vence, a, b)
+
+def _offspring(X, pais, inferior, superior, rng, mutacao=0.1):
+    # Cruzamento por mistura (BLX) entre pares de pais e mutação gaussiana (desvio = mutacao * largura do intervalo)
+    n, d = len(pais), X.shape[1]
+    a, b = X[pais], X[np.roll(pais, 1)]
+    u = rng.uniform(-0.25, 1.25, size=(n, d))
+    filhos = a + u * (b - a)
+
+    muta = rng.random((n, d)) < max(1 / d, 0.2)
+    filhos += muta * rng.normal(0, mutacao, size=(n, d)) * (superior - inferior)
+    return np.clip(filhos, inferior, superior)
+
+def optimize(limites, v_impacto_max=None, deriva_max=None, t_voo_max=None, objetivos=('v_impacto', 'deriva'),
+             populacao=100, geracoes=20, seed=None, overrides=None, **ensemble_kwargs):
+    # limites: {nome no config.py: (min, max)} dos parâmetros otimizados (ver PARAMETROS_OTIMIZAVEIS)
+    # v_impacto_max, deriva_max, t_voo_max: restrições (None = sem limite); deriva = |x_final|
+    # objetivos: saídas minimizadas (ver OBJETIVOS)
+    # overrides: valores fixos dos demais parâmetros (como no Solver)
+    # ensemble_kwargs: opções do solve_ensemble (dt_max, step_factor, t_max)
+    # Retorna {'pareto': lista de {parâmetro: valor, saída: valor} das configurações viáveis não dominadas, 'avaliacoes', 'prefixo'}
+
+    nomes = list(limites)
+    for nome in nomes:
+        if nome not in PARAMETROS_OTIMIZAVEIS:
+            raise ValueError(f"Parâmetro '{nome}' não pode ser otimizado. Use um de: {', '.join(PARAMETROS_OTIMIZAVEIS)}.")
+    for objetivo in objetivos:
+        if objetivo not in OBJETIVOS:
+            raise ValueError(f"Objetivo '{objetivo}' desconhecido. Use um de: {', '.join(OBJETIVOS)}.")
+
+    solver = Solver(overrides)
+    restricoes = {'v_impacto': v_impacto_max, 'deriva': deriva_max, 't_voo': t_voo_max}
+    inferior = np.array([limites[nome][0] for nome in nomes], dtype=float)
+    superior = np.array([limites[nome][1] for nome in nomes], dtype=float)
+    rng = np.random.default_rng(seed)
+
+    # Trecho balístico comum: até a maior altitude de abertura que algum candidato pode ter
+    y_topo = max(superior[nomes.index(nome)] if nome in nomes else getattr(solver, Solver.CONFIG_ATTRS[nome]) for nome in ALTURAS)
+    t0, S0 = ballistic_prefix(solver, y_topo)
+
+    def avaliar(X):
+        resultado = evaluate(solver, nomes, X, S0, t0, **ensemble_kwargs)
+        F = np.column_stack([resultado[objetivo] for objetivo in objetivos])
+        return resultado, np.nan_to_num(F, nan=np.inf), violation(solver, nomes, X, resultado, restricoes)
+
+    # População inicial
+    amostras = latin_hypercube(dict(zip(nomes, zip(inferior, superior))), populacao, seed=seed)
+    X = np.array([[ponto[nome] for nome in nomes] for ponto in amostras])
+    resultado, F, v = avaliar(X)
+    avaliacoes = len(X)
+
+    for _ in range(geracoes):
+        ranks = pareto_ranks(F, v)
+        pais = _select(ranks, crowding(F, ranks), populacao, rng)
+        filhos = _offspring(X, pais, inferior, superior, rng)
+        resultado_filhos, F_filhos, v_filhos = avaliar(filhos)
+        avaliacoes += len(filhos)
+
+        # Pais + filhos: ficam os melhores por frente e, na última frente que cabe, os mais espalhados
+        X = np.vstack([X, filhos])
+        F = np.vstack([F, F_filhos])
+        v = np.concatenate([v, v_filhos])
+        resultado = {saida: np.concatenate([resultado[saida], resultado_filhos[saida]]) for saida in resultado}
+
+        ranks = pareto_ranks(F, v)
+        ordem = np.lexsort((-crowding(F, ranks), ranks))[:populacao]
+        X, F, v = X[ordem], F[ordem], v[ordem]
+        resultado = {saida: valores[ordem] for saida, valores in resultado.items()}
+
+    # Conjunto de Pareto: viáveis da primeira frente, sem repetições, ordenados pelo primeiro objetivo
+    ranks = pareto_ranks(F, v)
+    escolhidos = np.flatnonzero((ranks == 0) & (v == 0))
+    _, unicos = np.unique(F[escolhidos], axis=0, return_index=True)
+    escolhidos = escolhidos[np.sort(unicos)]
+    escolhidos = escolhidos[np.argsort(F[escolhidos, 0])]
+
+    pareto = [
+        {**{nome: float(X[i, j]) for j, nome in enumerate(nomes)},
+         **{saida: float(resultado[saida][i]) for saida in ('t_voo', 'x_final', 'v_impacto')}}
+        for i in escolhidos
+    ]
+
+    return {'pareto': pareto, 'avaliacoes': avaliacoes, 'prefixo': (t0, float(S0[0]))}
+
+def _parse_param(texto):
+    # NOME=a:b --> limites do parâmetro
+    nome, valores = texto.split('=', 1)
+    a, b = valores.split(':')
+    return nome, (float(a), float(b))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Otimização das aberturas e dos paraquedas (conjunto de Pareto)")
+    parser.add_argument('--param', action='append', default=[], help="NOME=a:b (parâmetro do config.py e seus limites)")
+    parser.add_argument('--v-impacto-max', type=float, default=None, help="Velocidade de impacto máxima [m/s]")
+    parser.add_argument('--deriva-max', type=float, default=None, help="Deriva horizontal máxima [m]")
+    parser.add_argument('--t-voo-max', type=float, default=None, help="Tempo de descida máximo [s]")
+    parser.add_argument('--objetivo', action='append', default=None, choices=OBJETIVOS, help="Saída minimizada (padrão: v_impacto e deriva)")
+    parser.add_argument('--populacao', type=int, default=100, help="Candidatos por geração")
+    parser.add_argument('--geracoes', type=int, default=20, help="Número de gerações")
+    parser.add_argument('--seed', type=int, default=None, help="Semente da busca")
+    parser.add_argument('--saida', default=None, help="Arquivo CSV com o conjunto de Pareto")
+    args = parser.parse_args()
+
+    if not args.param:
+        parser.error("Informe pelo menos um --param.")
+
+    limites = dict(_parse_param(p) for p in args.param)
+    for nome in limites:
+        if nome not in PARAMETROS_OTIMIZAVEIS:
+            parser.error(f"Parâmetro '{nome}' não pode ser otimizado.")
+
+    resultado = optimize(
+        limites,
+        v_impacto_max=args.v_impacto_max,
+        deriva_max=args.deriva_max,
+        t_voo_max=args.t_voo_max,
+        objetivos=tuple(args.objetivo or ('v_impacto', 'deriva')),
+        populacao=args.populacao,
+        geracoes=args.geracoes,
+        seed=args.seed,
+    )
+
+    pareto = resultado['pareto']
+    print(f"{resultado['avaliacoes']} avaliações, {len(pareto)} configurações no conjunto de Pareto")
+    if not pareto:
+        print("Nenhuma configuração satisfaz as restrições.")
+    else:
+        for ponto in pareto:
+            print(', '.join(f"{nome} = {valor:.3f}" for nome, valor in ponto.items()))
+
+        path = args.saida or os.path.join(PATH_RESULTADOS, "otimizacao.csv")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            escritor = csv.DictWriter(f, fieldnames=list(pareto[0]))
+            escritor.writeheader()
+            escritor.writerows(pareto)
+        print(f"Conjunto de Pareto em: {path}")
@@ -0,0 +1,193 @@
+#server.py
+
+# Servidor local de simulações: mantém SciPy, matplotlib e o Solver/Visualizer carregados num pool de processos
+# Cada `python main.py` paga a importação do SciPy e do matplotlib (e o estilo do scienceplots) antes de qualquer conta;
+# com o servidor rodando, esse custo é pago uma única vez e cada simulação custa só a integração
+
+# Protocolo: um job por linha, em JSON, por um socket Unix (padrão) ou TCP em localhost; a resposta também é uma linha JSON
+#   {"params": {"ALTURA_ABERTURA_MAIN": 700}, "modo": "solve", "opcoes": {"method": "RK45", "dense": true}, "relatorio": false, "cache": false}
+#   params      substituições do config.py (como em Solver(overrides))
+#   modo        'solve', 'segmented' ou 'terminal'
+#   opcoes      argumentos do método de integração (dt, method, rtol, atol, ...); "method": "auto" no solve usa o ajuste calibrado do cenário (ver autotune.py)
+#   relatorio   true gera o relatório (figuras + relatorio.md) numa pasta nova em PATH_RESULTADOS/servidor (uma por job) e devolve o caminho
+#   cache       true usa o cache de resultados (ver cache.py)
+# Resposta: {"ok": true, "id": ..., "resumo": {...}, "relatorio": caminho ou null, "tempo_job": s}
+#           {"ok": false, "erro": mensagem}
+# Comandos: {"comando": "ping"} e {"comando": "parar"}
+
+# Exemplos:
+#   python server.py serve --workers 4
+#   python server.py submit '{"params": {"AREA_MAIN": 4}, "opcoes": {"dense": true}}'
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config import PATH_RESULTADOS
+
+SOCKET_PADRAO = os.path.join(PATH_RESULTADOS, "servidor.sock")
+
+MODOS = ('solve', 'segmented', 'terminal')
+
+def _warm_up():
+    # Inicialização de cada processo do pool: importa tudo o que os jobs usam (SciPy, matplotlib, estilo)
+    # e roda uma integração curta para aquecer o que é preparado na primeira chamada
+    import cache, sweep, visualizer # noqa: F401
+    from solver import Solver
+    Solver().solve_terminal()
+
+def run_job(job):
+    # Executa um job (ver o formato no topo do arquivo) num processo do pool e retorna a resposta
+    from solver import Solver
+    from sweep import point_id
+
+    inicio = time.perf_counter()
+    modo = job.get('modo', 'solve')
+    if modo not in MODOS:
+        raise ValueError(f"Modo '{modo}' desconhecido. Use um de: {', '.join(MODOS)}.")
+
+    solver = Solver(job.get('params'))
+    opcoes = dict(job.get('opcoes') or {})
+    if job.get('cache') and modo != 'terminal':
+        from cache import ResultCache
+        opcoes['cache'] = ResultCache()
+
+    if modo == 'solve':
+        solver.solve(**opcoes)
+    elif modo == 'segmented':
+        solver.solve_segmented(**opcoes)
+    else:
+        solver.solve_terminal(**opcoes)
+
+    identificador = point_id({campo: job.get(campo) for campo in ('params', 'modo', 'opcoes', 'relatorio', 'cache')})
+    relatorio = None
+    if job.get('relatorio'):
+        from visualizer import Visualizer
+        # Pasta de resultados do config simulado (com as substituições do job) e uma pasta por job:
+        # jobs iguais rodando ao mesmo tempo não escrevem as mesmas figuras
+        visualizer = Visualizer(config=solver.config)
+        visualizer.results_dir = os.path.join(visualizer.results_dir, 'servidor', f"{identificador}-{uuid.uuid4().hex[:8]}")
+        visualizer.load_solution(solver)
+        relatorio = visualizer.generate_report(workers=1) # Já estamos num processo do pool
+
+    return {
+        'ok': True,
+        'id': identificador,
+        'resumo': solver.summary(),
+        'relatorio': relatorio,
+        'tempo_job': time.perf_counter() - inicio,
+    }
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Uma conexão: lê um job por linha, manda para o pool e responde na mesma ordem
+
+    def handle(self):
+        for linha in self.rfile:
+            if not linha.strip():
+                continue
+            try:
+                job = json.loads(linha)
+                if job.get('comando') == 'ping':
+                    resposta = {'ok': True, 'pid': os.getpid()}
+                elif job.get('comando') == 'parar':
+                    resposta = {'ok': True}
+                    threading.Thread(target=self.server.shutdown).start()
+                else:
+                    resposta = self.server.pool.submit(run_job, job).result()
+            except Exception as erro:
+                resposta = {'ok': False, 'erro': f"{type(erro).__name__}: {erro}"}
+
+            self.wfile.write((json.dumps(resposta) + '\n').encode())
+            self.wfile.flush()
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def serve(path=SOCKET_PADRAO, porta=None, workers=None):
+    # Sobe o servidor e atende até receber {"comando": "parar"} (ou Ctrl+C)
+    # porta: escuta em TCP 127.0.0.1:porta em vez do socket Unix path
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up)
+    # Cria os processos agora (e não no primeiro job), para que o primeiro job já encontre tudo carregado
+    for futuro in [pool.submit(os.getpid) for _ in range(workers)]:
+        futuro.result()
+
+    if porta is None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path) # Socket de uma execução anterior
+        servidor = _UnixServer(path, _Handler)
+        endereco = path
+    else:
+        servidor = _TCPServer(('127.0.0.1', porta), _Handler)
+        endereco = f"127.0.0.1:{porta}"
+
+    servidor.pool = pool
+    print(f"Servidor ouvindo em {endereco} com {workers} processos")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        pool.shutdown()
+        if porta is None and os.path.exists(path):
+            os.remove(path)
+
+def _connect(path=SOCKET_PADRAO, porta=None):
+    if porta is None:
+        conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conexao.connect(path)
+    else:
+        conexao = socket.create_connection(('127.0.0.1', porta))
+    return conexao
+
+def submit(job, path=SOCKET_PADRAO, porta=None):
+    # Manda um job (ou comando) para o servidor e espera a resposta
+    with _connect(path, porta) as conexao, conexao.makefile('rwb') as arquivo:
+        arquivo.write((json.dumps(job) + '\n').encode())
+        arquivo.flush()
+        return json.loads(arquivo.readline())
+
+def submit_many(jobs, path=SOCKET_PADRAO, porta=None, conexoes=None):
+    # Manda vários jobs ao mesmo tempo (uma conexão por job em andamento) e retorna as respostas na ordem dos jobs
+    with ThreadPoolExecutor(max_workers=conexoes or os.cpu_count() or 1) as threads:
+        return list(threads.map(lambda job: submit(job, path, porta), jobs))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de simulações")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_serve = comandos.add_parser('serve', help="Sobe o servidor")
+    p_serve.add_argument('--workers', type=int, default=None, help="Número de processos (padrão: número de núcleos)")
+
+    p_submit = comandos.add_parser('submit', help="Manda um job (JSON) e mostra a resposta")
+    p_submit.add_argument('job', help="Job em JSON (ver o formato no topo do server.py); '-' lê um job por linha da entrada padrão")
+
+    p_stop = comandos.add_parser('stop', help="Para o servidor")
+
+    for p in (p_serve, p_submit, p_stop):
+        p.add_argument('--socket', default=SOCKET_PADRAO, help="Caminho do socket Unix")
+        p.add_argument('--porta', type=int, default=None, help="Usa TCP em 127.0.0.1 nesta porta em vez do socket Unix")
+    args = parser.parse_args()
+
+    if args.comando == 'serve':
+        serve(args.socket, args.porta, args.workers)
+    elif args.comando == 'stop':
+        print(json.dumps(submit({'comando': 'parar'}, args.socket, args.porta)))
+    else:
+        jobs = [json.loads(linha) for linha in sys.stdin if linha.strip()] if args.job == '-' else [json.loads(args.job)]
+        for resposta in submit_many(jobs, args.socket, args.porta):
+            print(json.dumps(resposta))
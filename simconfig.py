@@ -0,0 +1,116 @@
+#simconfig.py
+
+# Configuração de uma simulação como objeto imutável (um por Solver), com os valores padrão do config.py
+# Com ela, vários Solvers com configurações diferentes convivem no mesmo processo (threads, pools, cache) sem mexer no módulo config
+# É congelada (frozen), então pode ser usada como chave de dicionário, e mandá-la a outro processo custa só os ~30 valores
+
+# Cenários podem ser lidos de arquivos JSON ou TOML com os nomes do config.py (os que faltarem ficam com o valor do config.py):
+#   {"ALTURA_ABERTURA_MAIN": 700, "AREA_MAIN": 4, "MODELO_ATMOSFERA": "tabela"}
+#
+#   ALTURA_ABERTURA_MAIN = 700
+#   AREA_MAIN = 4
+#   MODELO_ATMOSFERA = "tabela"
+
+# Exemplos:
+#   config = SimConfig.load('cenario.toml')
+#   solver = Solver(config)
+#   outro = Solver(config.replace({'AREA_MAIN': 5}))
+
+import dataclasses
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+import config
+
+@dataclass(frozen=True)
+class SimConfig:
+    #Pasta dos Resultados
+    PATH_RESULTADOS: str = config.PATH_RESULTADOS
+
+    #Configurações do Foguete/Paraquedas
+    MASSA: float = config.MASSA
+    APOGEU: float = config.APOGEU
+    ALTURA_ABERTURA_DROGUE: float = config.ALTURA_ABERTURA_DROGUE
+    ALTURA_ABERTURA_REEFING: float = config.ALTURA_ABERTURA_REEFING
+    ALTURA_ABERTURA_MAIN: float = config.ALTURA_ABERTURA_MAIN
+
+    #Parâmetros para calcular arrasto
+    AREA_DROGUE: float = config.AREA_DROGUE
+    CD_DROGUE: float = config.CD_DROGUE
+    AREA_REEFING: float = config.AREA_REEFING
+    CD_REEFING: float = config.CD_REEFING
+    AREA_MAIN: float = config.AREA_MAIN
+    CD_MAIN: float = config.CD_MAIN
+    AREA_BASE_FOGUETE: float = config.AREA_BASE_FOGUETE
+    CD_FOGUETE: float = config.CD_FOGUETE
+
+    #Inflação dos paraquedas
+    DISTANCIA_INFLACAO_DROGUE: float = config.DISTANCIA_INFLACAO_DROGUE
+    DISTANCIA_INFLACAO_REEFING: float = config.DISTANCIA_INFLACAO_REEFING
+    DISTANCIA_INFLACAO_MAIN: float = config.DISTANCIA_INFLACAO_MAIN
+
+    #Gravidade
+    ACELERACAO_GRAVITACIONAL: float = config.ACELERACAO_GRAVITACIONAL
+
+    #Vento
+    VELOCIDADE_VENTO_HORIZONTAL: float = config.VELOCIDADE_VENTO_HORIZONTAL
+    VELOCIDADE_VENTO_VERTICAL: float = config.VELOCIDADE_VENTO_VERTICAL
+    PERFIL_VENTO: str = config.PERFIL_VENTO
+
+    #Parâmetros para cálculos de densidade do ar
+    CONSTANTE_UNIVERSAL_GASES: float = config.CONSTANTE_UNIVERSAL_GASES
+    MASSA_MOLAR_AR: float = config.MASSA_MOLAR_AR
+    GRADIENTE_TERMICO_TROPOSFERICO: float = config.GRADIENTE_TERMICO_TROPOSFERICO
+    GRADIENTE_TERMICO_ESTRATOSFERICO: float = config.GRADIENTE_TERMICO_ESTRATOSFERICO
+    TEMPERATURA_SOLO: float = config.TEMPERATURA_SOLO
+    PRESSAO_SOLO: float = config.PRESSAO_SOLO
+    ALTURA_SOLO: float = config.ALTURA_SOLO
+
+    #Modelo de atmosfera
+    MODELO_ATMOSFERA: str = config.MODELO_ATMOSFERA
+    PASSO_TABELA_ATMOSFERA: float = config.PASSO_TABELA_ATMOSFERA
+
+    def replace(self, overrides=None):
+        # Cópia com alguns valores trocados: {nome no config.py: valor}
+        if not overrides:
+            return self
+        desconhecidos = [nome for nome in overrides if nome not in self.__dataclass_fields__]
+        if desconhecidos:
+            raise ValueError(f"Parâmetro '{desconhecidos[0]}' não existe no config.py.")
+        return dataclasses.replace(self, **overrides)
+
+    def as_dict(self):
+        # {nome no config.py: valor}
+        return {nome: getattr(self, nome) for nome in self.__dataclass_fields__}
+
+    def diff(self, outra=None):
+        # Valores diferentes dos de outra configuração (padrão: os do config.py) --> {nome: valor}
+        outra = outra or SimConfig()
+        return {nome: valor for nome, valor in self.as_dict().items() if valor != getattr(outra, nome)}
+
+    def digest(self):
+        # Hash estável entre processos e execuções (o hash() do Python muda a cada execução para textos)
+        texto = json.dumps(self.as_dict(), sort_keys=True)
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+    @classmethod
+    def load(cls, path, base=None):
+        # Lê um cenário em JSON ou TOML (pela extensão); os valores que faltarem vêm de base (padrão: config.py)
+
+        extensao = os.path.splitext(path)[1].lower()
+        if extensao == '.json':
+            with open(path) as f:
+                valores = json.load(f)
+        elif extensao == '.toml':
+            import tomllib # Python 3.11+
+            with open(path, 'rb') as f:
+                valores = tomllib.load(f)
+        else:
+            raise ValueError(f"Formato de cenário '{extensao}' desconhecido. Use .json ou .toml.")
+
+        if not isinstance(valores, dict):
+            raise ValueError(f"O cenário {path} deve ser um objeto {{nome: valor}}.")
+
+        return (base or cls()).replace(valores)
@@ -1,108 +1,203 @@
 #solver.py
 
-from config import * # Carrega configurações
+import hashlib
+import inspect
+import json
 import numpy as np
+from contextlib import nullcontext
+from atmosphere import Atmosphere
+from instrumentation import Stats
+from simconfig import SimConfig # Configuração (valores padrão do config.py)
+from trajectory import Trajectory
+from wind import WindProfile
 from scipy.integrate import solve_ivp # Integradores já compilados do Fortran
+from scipy.optimize import OptimizeResult # Mesmo tipo de resultado do solve_ivp, para as soluções montadas aqui
+
+def _model_digest():
+    # Hash do código do modelo (este arquivo, atmosfera e vento): mudar as equações invalida as soluções em cache
+    # Pega o arquivo inteiro, então descomentar um trecho (ex: os paraquedas substituídos em cdA) também conta
+    h = hashlib.sha256()
+    for arquivo in (__file__, inspect.getsourcefile(Atmosphere), inspect.getsourcefile(WindProfile)):
+        with open(arquivo, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+MODELO = _model_digest()
 
 class Solver:
-    def __init__(self):
-        # Renomeando para nomes mais simples
-        
-        # Configurações do Foguete/Paraquedas
-        self.m, self.ap, self.yd, self.yr, self.ym = (
-            MASSA, 
-            APOGEU, 
-            ALTURA_ABERTURA_DROGUE,
-            ALTURA_ABERTURA_REEFING,  
-            ALTURA_ABERTURA_MAIN
-        ) 
-
-        # Parâmetros para calcular arrasto
-        self.AD, self.cdD, self.AR, self.cdR, self.AM, self.cdM, self.AF, self.cdF = (
-            AREA_DROGUE, 
-            CD_DROGUE,
-            AREA_REEFING,
-            CD_REEFING,
-            AREA_MAIN,
-            CD_MAIN,
-            AREA_BASE_FOGUETE,
-            CD_FOGUETE
-        )
+    # Métodos do solve_ivp que usam a Jacobiana
+    METODOS_IMPLICITOS = ('Radau', 'BDF', 'LSODA')
 
-        # Gravidade                  
-        self.g =  ACELERACAO_GRAVITACIONAL
+    # Atributos que podem ser variados por membro no modo ensemble (solve_ensemble)
+    # wind_member: membro do perfil de vento (quando o perfil tem vários membros, ver wind.py)
+    PARAMETROS_ENSEMBLE = ('m', 'yd', 'yr', 'ym', 'AD', 'cdD', 'AR', 'cdR', 'AM', 'cdM', 'AF', 'cdF', 'vx', 'vy', 'wind_member')
 
-        # Vento
-        self.vx, self.vy = (
-            VELOCIDADE_VENTO_HORIZONTAL,
-            VELOCIDADE_VENTO_VERTICAL
-        )
+    # Parâmetros das sensibilidades (solve_sensitivities)
+    # vx, vy: deslocamento uniforme do vento (com perfil de vento, somado ao perfil inteiro)
+    PARAMETROS_SENSIBILIDADE = ('ap', 'm', 'yd', 'yr', 'ym', 'AD', 'cdD', 'AR', 'cdR', 'AM', 'cdM', 'AF', 'cdF', 'vx', 'vy')
+
+    # Nome no config.py --> atributo do Solver
+    CONFIG_ATTRS = {
+        'MASSA': 'm',
+        'APOGEU': 'ap',
+        'ALTURA_ABERTURA_DROGUE': 'yd',
+        'ALTURA_ABERTURA_REEFING': 'yr',
+        'ALTURA_ABERTURA_MAIN': 'ym',
+        'AREA_DROGUE': 'AD',
+        'CD_DROGUE': 'cdD',
+        'AREA_REEFING': 'AR',
+        'CD_REEFING': 'cdR',
+        'AREA_MAIN': 'AM',
+        'CD_MAIN': 'cdM',
+        'AREA_BASE_FOGUETE': 'AF',
+        'CD_FOGUETE': 'cdF',
+        'DISTANCIA_INFLACAO_DROGUE': 'sD',
+        'DISTANCIA_INFLACAO_REEFING': 'sR',
+        'DISTANCIA_INFLACAO_MAIN': 'sM',
+        'ACELERACAO_GRAVITACIONAL': 'g',
+        'VELOCIDADE_VENTO_HORIZONTAL': 'vx',
+        'VELOCIDADE_VENTO_VERTICAL': 'vy',
+        'PERFIL_VENTO': 'perfil_vento',
+        'CONSTANTE_UNIVERSAL_GASES': 'R',
+        'MASSA_MOLAR_AR': 'M',
+        'GRADIENTE_TERMICO_TROPOSFERICO': 'L1',
+        'GRADIENTE_TERMICO_ESTRATOSFERICO': 'L2',
+        'TEMPERATURA_SOLO': 'T0',
+        'PRESSAO_SOLO': 'P0',
+        'ALTURA_SOLO': 'h0',
+        'MODELO_ATMOSFERA': 'modelo_atm',
+        'PASSO_TABELA_ATMOSFERA': 'dy_atm',
+    }
+
+    def __init__(self, overrides=None, stats=None, wind=None, config=None):
+        # overrides: {nome no config.py: valor} para substituir valores do config.py sem editar o arquivo
+        # Ex: Solver({'ALTURA_ABERTURA_MAIN': 700, 'AREA_MAIN': 4})
+        # Também aceita uma SimConfig no lugar do dicionário: Solver(SimConfig.load('cenario.toml'))
+        # stats: Stats (ver instrumentation.py) para medir chamadas e tempos; None desliga a instrumentação
+        # wind: WindProfile já carregado (ver wind.py); se None, usa o arquivo PERFIL_VENTO da configuração, se houver
+        # config: SimConfig base (ver simconfig.py); None usa os valores do config.py
+
+        if isinstance(overrides, SimConfig):
+            config, overrides = overrides, None
+
+        # Configuração desta instância (nada é lido do módulo config depois daqui)
+        self._config = (config or SimConfig()).replace(overrides)
+
+        # Renomeando para nomes mais simples (ver CONFIG_ATTRS)
+        for nome, attr in self.CONFIG_ATTRS.items():
+            setattr(self, attr, getattr(self._config, nome))
+
+        # Constantes das camadas calculadas uma única vez (ver atmosphere.py)
+        if self.modelo_atm not in ('exato', 'tabela'):
+            raise ValueError(f"Modelo de atmosfera '{self.modelo_atm}' desconhecido. Use 'exato' ou 'tabela'.")
+        self.atmosphere = self.build_atmosphere(table=self.modelo_atm == 'tabela')
+
+        # rho(y) escalar, chamado a cada avaliação do lado direito da EDO: a função do modo escolhido fica ligada aqui,
+        # sem passar por Atmosphere.rho nem checar o tipo a cada chamada (arrays usam self.atmosphere.rho)
+        self.rho = self.atmosphere._rho_table_scalar if self.atmosphere.table else self.atmosphere._rho_exact_scalar
+
+        # Atmosfera tabelada usada por rho_batch (construída na primeira chamada)
+        self._atmosphere_batch = None
 
-        # Parâmetros para cálculos de densidade do ar
-        self.R, self.M, self.L1, self.L2, self.T0, self.P0, self.h0 = (
-            CONSTANTE_UNIVERSAL_GASES,
-            MASSA_MOLAR_AR,
-            GRADIENTE_TERMICO_TROPOSFERICO,
-            GRADIENTE_TERMICO_ESTRATOSFERICO,
-            TEMPERATURA_SOLO,
-            PRESSAO_SOLO,
-            ALTURA_SOLO
+        # Perfil de vento (None --> velocidades constantes vx e vy); o arquivo só é lido uma vez por processo
+        if wind is None and self.perfil_vento:
+            wind = WindProfile.load(self.perfil_vento)
+        self.wind = wind
+
+        # Última solução (preenchida por solve) e aberturas registradas {nome: (t, S)}
+        self.sol = None
+        self.deployments = {}
+
+        # Trajetória compacta (preenchida por solve com dense = True)
+        self.trajectory = None
+
+        # Sensibilidades do pouso (preenchidas por solve_sensitivities)
+        self.sensitivities = None
+
+        # Instrumentação (desligada por padrão)
+        self.stats = None
+        if stats is not None:
+            self.enable_stats(stats)
+
+    def enable_stats(self, stats=None):
+        # Liga a instrumentação e retorna o objeto Stats
+        # Conta as chamadas de dSdt, F_drag, rho e dSdt_batch trocando a classe desta instância por _InstrumentedSolver
+        # (métodos com contador definidos na classe: o Solver instrumentado continua serializável e pode ir para um pool de processos)
+        # O tempo da etapa 'integracao' é dividido entre as fases do voo pela altitude de cada chamada de dSdt:
+        # o relógio só é lido quando a altitude sai da faixa da fase atual
+
+        self.stats = stats if stats is not None else Stats()
+        for nome in ('dSdt', 'F_drag', 'rho', 'dSdt_batch'):
+            self.stats.calls.setdefault(nome, 0)
+        self._faixa = [float('inf'), float('inf')] # (limite inferior, limite superior] da fase atual
+        if type(self) is Solver:
+            self.__class__ = _InstrumentedSolver
+            del self.rho # Sem o atalho de __init__, rho passa pelo método com contador
+        return self.stats
+
+    def _stage(self, nome):
+        # Cronometra uma etapa quando a instrumentação está ligada
+        return self.stats.stage(nome) if self.stats is not None else nullcontext()
+
+    def build_atmosphere(self, table=False):
+        # Cria o modelo de atmosfera com os parâmetros atuais do Solver (tabela cobre do solo até o apogeu)
+        return Atmosphere(
+            self.R, self.M, self.L1, self.L2, self.T0, self.P0, self.h0, self.g,
+            y_max=self.ap,
+            table=table,
+            dy=self.dy_atm
         )
 
-    def rho(self,y):
-        # Modelo para a densidade do ar em função da altitude
-        # Não faço ideia do que tá acontendo aqui, segui o que foi feito no código antigo e fuçando na internet
-        # Seria interessante olhar com mais cuidado
-        
-        h_abs = y + self.h0
-        
-        # 1. Camada troposférica (solo até 11 km de altitude absoluta)
-        if h_abs <= 11000:
-            T = self.T0 + self.L1 * y
-            expoente = -self.g * self.M / (self.R * self.L1)
-            P = self.P0 * (T / self.T0) ** expoente
-        
-        # 2. Baixa estratosfera (11-20 km de altitude absoluta)
-        elif h_abs <= 20000:
-            # Calcula condições no topo da troposfera
-            y_trop = 11000 - self.h0
-            T_trop = self.T0 + self.L1 * y_trop
-            expoente = -self.g * self.M / (self.R * self.L1)
-            P_trop = self.P0 * (T_trop / self.T0) ** expoente
-            
-            # Modelo estratosférico inferior (temperatura constante)
-            T = T_trop
-            P = P_trop * np.exp(-self.g * self.M * (h_abs - 11000) / (self.R * T_trop))
-        
-        # 3. Alta estratosfera (20-25 km de altitude absoluta)
-        else:
-            # Calcula condições no topo da troposfera
-            y_trop = 11000 - self.h0
-            T_trop = self.T0 + self.L1 * y_trop
-            expoente = -self.g * self.M / (self.R * self.L1)
-            P_trop = self.P0 * (T_trop / self.T0) ** expoente
-            
-            # Calcula condições a 20 km absoluto
-            P_20k = P_trop * np.exp(-self.g * self.M * (20000 - 11000) / (self.R * T_trop))
-            T_20k = T_trop
-            
-            # Aplica gradiente térmico estratosférico acima de 20 km
-            T = T_20k + self.L2 * (h_abs - 20000)
-            expoente_upper = -self.g * self.M / (self.R * self.L2)
-            P = P_20k * (T / T_20k) ** expoente_upper
-        
-        # Cálculo da densidade
-        return (P * self.M) / (self.R * T)
-    
-    def F_drag(self, S):
-        # Modelo para a força de arrasto
-        # Dependendo da forma que o paraquedas descer (reto, inclinado, etc) pode haver variações nos coefientes de arrasto para cada condição
-        # Essas variações vão ser desprezadas e vamos considerar que o paraquedas está sempre alinhado com a velocidade
-        # Efeitos como turbulência, torques sofridos, etc também são desprezados
+    @property
+    def wind_member(self):
+        # Membro do perfil de vento em uso (0 sem perfil)
+        return self.wind.membro if self.wind is not None else 0
 
-        y, y_dot, x, x_dot = S # Recebe a matriz S
+    def wind_at(self, y):
+        # Vento (vx, vy) na altitude y (escalar ou array): pelo perfil, se houver, ou as velocidades constantes
+        if self.wind is None:
+            return self.vx, self.vy
+        return self.wind(y)
 
+    @property
+    def inflation(self):
+        # Algum paraquedas tem inflação finita (DISTANCIA_INFLACAO_* > 0)
+        return self.sD > 0 or self.sR > 0 or self.sM > 0
+
+    @staticmethod
+    def fill(queda, distancia):
+        # Fração cheia de um paraquedas que já caiu queda metros abaixo da altitude de abertura: (f, df/dqueda)
+        # f = 3u² - 2u³ com u = queda/distancia (de 0 a 1): começa e termina com derivada nula, então o arrasto não tem saltos nem quinas
+        # distancia = 0 é a abertura instantânea (f = 1 a partir da altitude de abertura)
+        if distancia <= 0:
+            return (1.0 if queda >= 0 else 0.0), 0.0
+        u = queda / distancia
+        if u <= 0:
+            return 0.0, 0.0
+        if u >= 1:
+            return 1.0, 0.0
+        return u * u * (3 - 2 * u), 6 * u * (1 - u) / distancia
+
+    def cdA_inflation(self, y):
+        # k = cd*A na altitude y com a inflação de cada paraquedas, e dk/dy (usada na Jacobiana): (k, dk/dy)
+        # O arrasto do foguete some à medida que o drogue enche (como em cdA, onde o drogue substitui o foguete)
+
+        fD, dfD = self.fill(self.yd - y, self.sD)
+        fR, dfR = self.fill(self.yr - y, self.sR)
+        fM, dfM = self.fill(self.ym - y, self.sM)
+        kF, kD, kR, kM = self.cdF * self.AF, self.cdD * self.AD, self.cdR * self.AR, self.cdM * self.AM
+
+        k = kF * (1 - fD) + kD * fD + kR * fR + kM * fM
+        dk_dy = -((kD - kF) * dfD + kR * dfR + kM * dfM) # queda = altitude de abertura - y
+        return k, dk_dy
+
+    def cdA(self, y):
+        # Produto k = cd*A total na altitude y
         # Caso a caso considerando o momento em que cada paraquedas está aberto
+        # Com inflação finita (DISTANCIA_INFLACAO_*), cada paraquedas enche aos poucos (ver cdA_inflation)
+
+        if self.inflation:
+            return self.cdA_inflation(y)[0]
 
         ############### Se os paraquedas se sobrepõem ############
         k = 0 # k = cd * A
@@ -144,12 +239,62 @@ class Solver:
 
         #######################################################
 
+        return k
+
+    def cdA_partials(self, y):
+        # Derivadas de k = cdA(y) em relação a cada cd e área, na altitude y: {atributo: dk/dp} (mesmos casos de cdA)
+        # Sem inflação as altitudes de abertura não aparecem: mexer nelas só muda onde k salta (ver solve_sensitivities)
+        # Com inflação k é contínuo e as altitudes de abertura deslocam a rampa de cada paraquedas
+
+        if self.inflation:
+            fD, dfD = self.fill(self.yd - y, self.sD)
+            fR, dfR = self.fill(self.yr - y, self.sR)
+            fM, dfM = self.fill(self.ym - y, self.sM)
+            return {
+                'cdF': self.AF * (1 - fD), 'AF': self.cdF * (1 - fD),
+                'cdD': self.AD * fD, 'AD': self.cdD * fD,
+                'cdR': self.AR * fR, 'AR': self.cdR * fR,
+                'cdM': self.AM * fM, 'AM': self.cdM * fM,
+                'yd': (self.cdD * self.AD - self.cdF * self.AF) * dfD,
+                'yr': self.cdR * self.AR * dfR,
+                'ym': self.cdM * self.AM * dfM,
+            }
+
+        parciais = {}
+        if y > self.yd:
+            parciais.update(cdF=self.AF, AF=self.cdF)
+        if y <= self.yd:
+            parciais.update(cdD=self.AD, AD=self.cdD)
+        if y <= self.yr:
+            parciais.update(cdR=self.AR, AR=self.cdR)
+        if y <= self.ym:
+            parciais.update(cdM=self.AM, AM=self.cdM)
+        return parciais
+
+    def F_drag(self, S, k=None):
+        # Modelo para a força de arrasto
+        # Dependendo da forma que o paraquedas descer (reto, inclinado, etc) pode haver variações nos coefientes de arrasto para cada condição
+        # Essas variações vão ser desprezadas e vamos considerar que o paraquedas está sempre alinhado com a velocidade
+        # Efeitos como turbulência, torques sofridos, etc também são desprezados
+        # k: cd*A fixo (usado na integração por fases); se None, é calculado pela altitude com cdA
+
+        y, y_dot, x, x_dot = S # Recebe a matriz S
+
+        if k is None:
+            k = self.cdA(y)
+
         # Calcula a desnsidade do ar
         rho_value = self.rho(y) 
 
+        # Vento na altitude y (constante ou pelo perfil)
+        if self.wind is None:
+            vx, vy = self.vx, self.vy
+        else:
+            vx, vy = self.wind(y)
+
         # Velocidades Relativas ao vento
-        y_dot_rel = y_dot - self.vy
-        x_dot_rel = x_dot - self.vx 
+        y_dot_rel = y_dot - vy
+        x_dot_rel = x_dot - vx 
 
         # Modelo para a força de arrasto: F = (1/2)*rho*cd*A*v**2 \hat{v}
         Fx = -(1/2)* rho_value* k * (y_dot_rel**2 + x_dot_rel**2)**(1/2) * x_dot_rel
@@ -157,21 +302,317 @@ class Solver:
 
         return (Fx, Fy)
 
-    def dSdt(self, S):
+    def jac(self, S, k=None):
+        # Jacobiana analítica de dSdt, d(dSdt)/dS, para os métodos implícitos (Radau, BDF, LSODA)
+        # Sem ela o solve_ivp monta a Jacobiana por diferenças finitas, com 4 avaliações extras de dSdt a cada vez
+        # Com a = -(1/2)*rho*k/m, V = |v_rel| e u = (y_dot_rel, x_dot_rel):
+        #   d(a*V*u_i)/du_j = a*(V*delta_ij + u_i*u_j/V)
+        #   d(a*V*u_i)/dy   = a*V*u_i * (drho/dy)/rho   (k é constante por partes; os saltos de k não entram)
+        # Com perfil de vento u também depende de y (u = v - w(y)), o que soma -d(a*V*u_i)/du_j * dw_j/dy na coluna de y
+        # Com inflação k varia com y dentro da rampa, o que soma a*V*u_i*rho * (dk/dy)/k na coluna de y
+
+        y, y_dot, x, x_dot = S
+
+        dk_dy = 0.0
+        if k is None:
+            if self.inflation:
+                k, dk_dy = self.cdA_inflation(y)
+            else:
+                k = self.cdA(y)
+
+        rho_value = self.rho(y)
+        drho_value = self.atmosphere.drho(y)
+
+        vx, vy = self.wind_at(y)
+        y_dot_rel = y_dot - vy
+        x_dot_rel = x_dot - vx
+        V = (y_dot_rel**2 + x_dot_rel**2)**(1/2)
+
+        a = -(1/2) * k / self.m
+        J = np.zeros((4, 4))
+
+        J[0, 1] = 1
+        J[2, 3] = 1
+
+        # y_ddot = -g + a*rho*V*y_dot_rel
+        J[1, 0] = a * drho_value * V * y_dot_rel
+
+        # x_ddot = a*rho*V*x_dot_rel
+        J[3, 0] = a * drho_value * V * x_dot_rel
+
+        if dk_dy:
+            J[1, 0] += -(1/2) * dk_dy / self.m * rho_value * V * y_dot_rel
+            J[3, 0] += -(1/2) * dk_dy / self.m * rho_value * V * x_dot_rel
+
+        if V > 0:
+            ar = a * rho_value
+            J[1, 1] = ar * (V + y_dot_rel**2 / V)
+            J[1, 3] = ar * y_dot_rel * x_dot_rel / V
+            J[3, 1] = J[1, 3]
+            J[3, 3] = ar * (V + x_dot_rel**2 / V)
+
+            if self.wind is not None:
+                dvx, dvy = self.wind.slope(y)
+                J[1, 0] -= J[1, 1] * dvy + J[1, 3] * dvx
+                J[3, 0] -= J[3, 1] * dvy + J[3, 3] * dvx
+
+        return J
+
+    def dSdt(self, S, k=None):
         # Modelo matemático em formato matricial
         # S = [y, y_dot, x, x_dot] --> matriz
         # dSdt = [y_dot, y_ddot, x_dot, x_ddot]
         # Precisamos escrever y_ddot e x_ddot em termos de um modelo físico
         
         y, y_dot, x, x_dot = S
-        Fx, Fy = self.F_drag(S)
+        Fx, Fy = self.F_drag(S, k)
 
         y_ddot = -self.g + 1/self.m * Fy
         x_ddot = 1/self.m * Fx
 
         return [y_dot, y_ddot, x_dot, x_ddot]
     
-    def solve(self, dt = 0.001, t_max = 1000, method = 'Radau', rtol = 1e-6, atol = 1e-8 ): 
+    def rho_batch(self, y):
+        # Versão de rho para arrays de altitudes usada no modo ensemble
+        # Sempre usa a atmosfera tabelada (a do Solver se já estiver em modo tabela), bem mais rápida que as fórmulas para arrays grandes
+
+        if self._atmosphere_batch is None:
+            self._atmosphere_batch = self.atmosphere if self.atmosphere.table else self.build_atmosphere(table=True)
+        return self._atmosphere_batch.rho(y)
+
+    def sample_ensemble(self, n, sigmas, seed=None, wind_members=None):
+        # Gera n amostras (distribuição normal) em torno dos valores nominais do Solver
+        # sigmas: {nome do atributo: desvio padrão}, ex: {'m': 0.1, 'vx': 1.5, 'cdM': 0.05}
+        # wind_members: sorteia (uniforme) um membro do perfil de vento para cada amostra; None sorteia se o perfil tiver mais de um membro
+
+        rng = np.random.default_rng(seed)
+        params = {}
+        for nome, sigma in sigmas.items():
+            if nome not in self.PARAMETROS_ENSEMBLE or nome == 'wind_member':
+                raise ValueError(f"Parâmetro '{nome}' não pode ser variado no ensemble.")
+            params[nome] = getattr(self, nome) + sigma * rng.standard_normal(n)
+
+        if wind_members is None:
+            wind_members = self.wind is not None and self.wind.n_members > 1
+        if wind_members:
+            if self.wind is None:
+                raise ValueError("Sem perfil de vento para sortear membros.")
+            params['wind_member'] = rng.integers(self.wind.n_members, size=n)
+        return params
+
+    def _wind_batch(self, y, p):
+        # Vento (vx, vy) de cada membro do ensemble: pelo perfil (membro p['wind_member']) ou os valores constantes p['vx'], p['vy']
+        if self.wind is None:
+            return p['vx'], p['vy']
+        return self.wind.at(y, p['wind_member'])
+
+    def dSdt_batch(self, S, p):
+        # Versão vetorizada de dSdt: S tem formato (4, N) e p é um dicionário de parâmetros (escalares ou arrays de tamanho N)
+        # Mesmo modelo de F_drag (paraquedas se sobrepõem), avaliado para todos os membros de uma vez
+        # p['kF'], p['kD'], p['kR'], p['kM'] são os produtos cd*A já calculados
+        # O paraquedas é considerado aberto a partir de p['snap'] metros acima da altitude de abertura,
+        # para que um membro que parou exatamente na altitude de abertura já dê o próximo passo com o paraquedas aberto
+
+        y, y_dot, x, x_dot = S
+        y = y - p['snap']
+
+        if self.inflation:
+            # Mesma rampa de Solver.fill, para todos os membros
+            f = {}
+            for nome, alt, distancia in (('D', 'yd', self.sD), ('R', 'yr', self.sR), ('M', 'ym', self.sM)):
+                if distancia > 0:
+                    u = np.clip((p[alt] - y) / distancia, 0.0, 1.0)
+                    f[nome] = u * u * (3 - 2 * u)
+                else:
+                    f[nome] = (y <= p[alt]).astype(float)
+            k = p['kF'] * (1 - f['D']) + p['kD'] * f['D'] + p['kR'] * f['R'] + p['kM'] * f['M']
+        else:
+            k = (np.where(y > p['yd'], p['kF'], p['kD'])
+                 + np.where(y <= p['yr'], p['kR'], 0.0)
+                 + np.where(y <= p['ym'], p['kM'], 0.0))
+
+        vx, vy = self._wind_batch(y, p)
+        y_dot_rel = y_dot - vy
+        x_dot_rel = x_dot - vx
+        v_rel = np.sqrt(y_dot_rel**2 + x_dot_rel**2)
+
+        c = -(1/2) * self.rho_batch(y) * k * v_rel / p['m']
+
+        return np.array([y_dot, -p['g'] + c * y_dot_rel, x_dot, c * x_dot_rel])
+
+    def solve_ensemble(self, params=None, n=None, dt_max=2.0, step_factor=1.0, t_max=1000, S0=None, t0=0.0):
+        # Integra N trajetórias de uma vez com RK4 vetorizado em NumPy (estado com formato (4, N))
+        # params: {nome do atributo: array de tamanho N} (ver sample_ensemble); atributos omitidos usam o valor nominal
+        # S0, t0: estado inicial (4,) ou (4, N) e instante inicial; o padrão é parado no apogeu em t = 0
+        #         Serve para começar de um trecho já integrado e comum a todos os membros (ex: a queda balística acima de todas as aberturas)
+        # Cada membro usa seu próprio passo de tempo:
+        #   - limitado por step_factor / (taxa de relaxação do arrasto), que é a escala de tempo da equação
+        #   - ajustado para cair em cima da próxima altitude de abertura (ou do solo), evitando integrar através da descontinuidade
+        # Cada membro para no seu próprio cruzamento com o solo
+        # Membros que não chegam ao solo até t_max ficam com t_voo, x_final e velocidades NaN e pousou = False
+
+        params = {} if params is None else params
+        for nome in params:
+            if nome not in self.PARAMETROS_ENSEMBLE:
+                raise ValueError(f"Parâmetro '{nome}' não pode ser variado no ensemble.")
+            if self.wind is not None and nome in ('vx', 'vy'):
+                raise ValueError("Com perfil de vento, varie o membro do perfil ('wind_member') em vez de vx e vy.")
+            if self.wind is None and nome == 'wind_member':
+                raise ValueError("Sem perfil de vento: 'wind_member' não se aplica.")
+
+        if n is None:
+            n = max((np.size(v) for v in params.values()), default=1)
+
+        p = {nome: np.broadcast_to(np.asarray(params.get(nome, getattr(self, nome)), dtype=float), (n,)).copy()
+             for nome in self.PARAMETROS_ENSEMBLE}
+        p['kF'], p['kD'], p['kR'], p['kM'] = p['cdF'] * p['AF'], p['cdD'] * p['AD'], p['cdR'] * p['AR'], p['cdM'] * p['AM']
+
+        # Altitudes de abertura de cada paraquedas: (nome, array)
+        aberturas = [('drogue', p['yd']), ('reefing', p['yr']), ('main', p['ym'])]
+        snap = 1e-3 # Distância [m] abaixo da qual consideramos que o membro já está na altitude alvo
+
+        # Parâmetros usados na integração (somente os membros ativos, compactados quando algum membro pousa)
+        pa = {nome: p[nome] for nome in ('m', 'vx', 'vy', 'yd', 'yr', 'ym', 'kF', 'kD', 'kR', 'kM')}
+        pa['wind_member'] = p['wind_member'].astype(np.intp)
+        pa['g'], pa['snap'] = self.g, snap
+
+        # Estado e tempo dos membros ativos
+        if S0 is None:
+            S0 = [self.ap, 0, 0, 0]
+        Sa = np.array(np.broadcast_to(np.reshape(np.asarray(S0, dtype=float), (4, -1)), (4, n)))
+        ta = np.full(n, float(t0))
+
+        t_abertura = {nome: np.full(n, np.nan) for nome, _ in aberturas}
+        for nome, alt in aberturas:
+            t_abertura[nome][alt + snap >= Sa[0]] = t0 # Já aberto no início
+
+        S_final = np.full((4, n), np.nan)
+        t_final = np.full(n, np.nan)
+        pousaram = np.zeros(n, dtype=bool)
+        ativos = np.arange(n)
+        n_passos = 0
+
+        while ativos.size:
+            y, y_dot = Sa[0], Sa[1]
+
+            # Próxima altitude alvo (maior altitude de abertura abaixo do membro, ou o solo)
+            alvo = np.zeros(ativos.size)
+            for nome in ('yd', 'yr', 'ym'):
+                alt = pa[nome]
+                alvo = np.where((alt < y - snap) & (alt > alvo), alt, alvo)
+            if self.inflation:
+                # Fim da rampa de enchimento de cada paraquedas (a partir dali k volta a ser constante)
+                for nome, distancia in (('yd', self.sD), ('yr', self.sR), ('ym', self.sM)):
+                    alt = pa[nome] - distancia
+                    alvo = np.where((distancia > 0) & (alt < y - snap) & (alt > alvo), alt, alvo)
+
+            # Passo de tempo de cada membro
+            k_Sa = self.dSdt_batch(Sa, pa)
+            vx, vy = self._wind_batch(y, pa)
+            v_rel = np.sqrt((Sa[1] - vy)**2 + (Sa[3] - vx)**2)
+            taxa = np.abs(k_Sa[1] + pa['g']) / np.maximum(v_rel, 1e-9) # |a_arrasto| / |v_rel| = rho*k*|v|/(2m)
+            h = np.minimum(dt_max, step_factor / np.maximum(2 * taxa, 1e-12))
+            descendo = y_dot < 0
+            h = np.where(descendo, np.minimum(h, (y - alvo) / np.where(descendo, -y_dot, 1.0)), h)
+            if self.inflation:
+                # Dentro de uma rampa de enchimento, no máximo 1/8 da distância de inflação por passo
+                for nome, distancia in (('yd', self.sD), ('yr', self.sR), ('ym', self.sM)):
+                    if distancia > 0:
+                        enchendo = descendo & (y <= pa[nome] + snap) & (y > pa[nome] - distancia + snap)
+                        h = np.where(enchendo, np.minimum(h, distancia / 8 / np.where(descendo, -y_dot, 1.0)), h)
+            h = np.maximum(h, 1e-6)
+
+            # RK4 clássico
+            k1 = k_Sa
+            k2 = self.dSdt_batch(Sa + h/2 * k1, pa)
+            k3 = self.dSdt_batch(Sa + h/2 * k2, pa)
+            k4 = self.dSdt_batch(Sa + h * k3, pa)
+            S_novo = Sa + h/6 * (k1 + 2*k2 + 2*k3 + k4)
+            t_novo = ta + h
+
+            # Instantes de abertura (interpolação linear dentro do passo)
+            for nome, chave in (('drogue', 'yd'), ('reefing', 'yr'), ('main', 'ym')):
+                alt = pa[chave] + snap
+                cruzou = (y > alt) & (S_novo[0] <= alt)
+                if np.any(cruzou):
+                    frac = (y[cruzou] - alt[cruzou]) / (y[cruzou] - S_novo[0, cruzou])
+                    t_abertura[nome][ativos[cruzou]] = ta[cruzou] + frac * h[cruzou]
+
+            # Membros que chegaram ao solo (interpolação linear até y = 0)
+            pousou = S_novo[0] <= snap
+            if np.any(pousou):
+                idx = ativos[pousou]
+                frac = np.clip(y[pousou] / np.maximum(y[pousou] - S_novo[0, pousou], 1e-12), 0, 1)
+                S_final[:, idx] = Sa[:, pousou] + frac * (S_novo[:, pousou] - Sa[:, pousou])
+                t_final[idx] = ta[pousou] + frac * h[pousou]
+                pousaram[idx] = True
+
+            # Membros que pousaram ou chegaram a t_max ainda no ar (estes ficam com NaN: não há ponto de pouso)
+            terminou = pousou | (t_novo >= t_max)
+            if np.any(terminou):
+                # Compacta os arrays para continuar apenas com os membros ainda no ar
+                restantes = ~terminou
+                ativos = ativos[restantes]
+                S_novo, t_novo = S_novo[:, restantes], t_novo[restantes]
+                pa = {nome: (v[restantes] if np.ndim(v) else v) for nome, v in pa.items()}
+
+            Sa, ta = S_novo, t_novo
+            n_passos += 1
+
+        v_impacto = np.sqrt(S_final[1]**2 + S_final[3]**2)
+
+        resultado = {
+            'params': p,
+            'n': n,
+            'n_passos': n_passos,
+            'pousou': pousaram,
+            't_voo': t_final,
+            'x_final': S_final[2],
+            'vx_impacto': S_final[3],
+            'vy_impacto': S_final[1],
+            'v_impacto': v_impacto,
+            't_drogue': t_abertura['drogue'],
+            't_reefing': t_abertura['reefing'],
+            't_main': t_abertura['main'],
+        }
+
+        # Estatísticas resumidas de cada saída
+        resultado['estatisticas'] = {
+            nome: {
+                'media': np.nanmean(resultado[nome]),
+                'desvio': np.nanstd(resultado[nome]),
+                'min': np.nanmin(resultado[nome]),
+                'p05': np.nanpercentile(resultado[nome], 5),
+                'p50': np.nanpercentile(resultado[nome], 50),
+                'p95': np.nanpercentile(resultado[nome], 95),
+                'max': np.nanmax(resultado[nome]),
+            }
+            for nome in ('t_voo', 'x_final', 'v_impacto', 't_drogue', 't_reefing', 't_main')
+            if not np.all(np.isnan(resultado[nome]))
+        }
+
+        self.ensemble = resultado
+        return resultado
+
+    def solve(self, dt = 0.001, t_max = 1000, method = 'Radau', rtol = 1e-6, atol = 1e-8, jac = True, dense = False, cache = None): 
+        # method = 'terminal' usa o modelo quase estacionário de velocidade terminal (ver solve_terminal)
+        # method = 'auto' usa o integrador mais rápido que cumpre o orçamento de erro padrão neste cenário (ver autotune.py)
+        # jac = True passa a Jacobiana analítica para os métodos implícitos (Radau, BDF, LSODA); False volta às diferenças finitas
+        # dense = True guarda só os passos aceitos (sem a grade de dt) e monta self.trajectory para reamostrar depois (ver trajectory.py)
+        # cache: ResultCache (ver cache.py); se a mesma configuração já foi resolvida, a solução guardada é usada
+
+        if method == 'terminal':
+            return self.solve_terminal()
+
+        if method == 'auto':
+            # Modo (solve ou segmented), método e tolerâncias vêm da calibração (feita uma vez por cenário); rtol e atol passados aqui são ignorados
+            from autotune import run, tune
+            opcoes = {'dt': dt, 't_max': t_max, 'jac': jac, 'dense': dense} # A calibração roda com as mesmas opções de saída
+            return run(self, tune(self.config, wind=self.wind, opcoes=opcoes), cache=cache, **opcoes)
+
+        if cache is not None:
+            opcoes = {'modo': 'solve', 'dt': dt, 't_max': t_max, 'method': method, 'rtol': rtol, 'atol': atol, 'jac': jac, 'dense': dense}
+            return self._solve_cached(cache, opcoes, lambda: self.solve(dt, t_max, method, rtol, atol, jac, dense))
 
         # O código original implementa RK45 (até quarta ordem); DOP853 vai até a oitava, mas requer mais poder computacional
         # Esses dois métodos funcionam até que bem mas geram algumas coisas bizarras
@@ -182,7 +623,7 @@ class Solver:
 
         # É notável que o foguete sempre atinge velocidade terminal muito rápido, o que explica os saltos no gráfico. Logo, um modelo puramente analítico, que resolve y(t) e x(t) apenas considerando velocidades terminais provavelmente daria certo.
         
-        t_eval = np.arange(0, t_max, dt)
+        t_eval = None if dense else np.arange(0, t_max, dt)
 
         func = lambda t,S: self.dSdt(S) 
 
@@ -193,17 +634,550 @@ class Solver:
         ground_event.terminal = True 
         ground_event.direction = -1 # Troca de sinal
 
-        sol = solve_ivp(
-            func,
-            [0, t_max],
-            [self.ap,0,0,0],
-            t_eval=t_eval,
-            method=method,
-            events=ground_event,
-            rtol=rtol,
-            atol=atol
-        )
+        # Um evento (não terminal) por abertura: o solve_ivp localiza o instante exato em que y cruza cada altitude,
+        # então os instantes de abertura não dependem de dt
+        aberturas = self.deployment_altitudes()
+        events = [ground_event]
+        for _, alt in aberturas:
+            deployment_event = lambda t, S, a=alt: S[0] - a
+            deployment_event.direction = -1
+            events.append(deployment_event)
+
+        with self._stage('integracao'):
+            sol = solve_ivp(
+                func,
+                [0, t_max],
+                [self.ap,0,0,0],
+                t_eval=t_eval,
+                method=method,
+                events=events,
+                rtol=rtol,
+                atol=atol,
+                **self._jac_kwargs(method, jac)
+            )
 
         self.sol = sol
-    
+        self.trajectory = None
+
+        # Instantes e estados exatos de cada abertura (como no solve_segmented)
+        self.deployments = {}
+        for i, (nome, alt) in enumerate(aberturas, start=1):
+            if sol.t_events[i].size:
+                S = sol.y_events[i][0].copy()
+                S[0] = alt
+                self.deployments[nome] = (float(sol.t_events[i][0]), S)
+        sol.t_events, sol.y_events = sol.t_events[:1], sol.y_events[:1] # Só o solo, como nos outros modos
+
+        if dense:
+            with self._stage('trajetoria'):
+                sol.yp = np.array([self.dSdt(S) for S in sol.y.T]).T
+                self.trajectory = self._build_trajectory()
+
+    def _build_trajectory(self):
+        # Trajetória compacta a partir dos passos aceitos da última solução (self.sol.t, self.sol.y e self.sol.yp)
+        meta = {
+            'ap': float(self.ap),
+            'yd': float(self.yd),
+            'yr': float(self.yr),
+            'ym': float(self.ym),
+            'aberturas': {nome: float(t) for nome, (t, _) in self.deployments.items()},
+        }
+        return Trajectory.from_steps(self.sol.t, self.sol.y, self.sol.yp, meta)
+
+    def _jac_kwargs(self, method, jac, k=None):
+        # Argumento jac do solve_ivp (só os métodos implícitos usam a Jacobiana)
+        if jac and method in self.METODOS_IMPLICITOS:
+            return {'jac': lambda t, S: self.jac(S, k)}
+        return {}
+
+    def integration_stats(self):
+        # Custo da última integração: avaliações de dSdt (nfev), da Jacobiana (njev) e decomposições LU (nlu)
+        if self.sol is None:
+            raise ValueError("Solução não calculada. Use solve() primeiro.")
+        return {'nfev': int(self.sol.nfev), 'njev': int(self.sol.njev), 'nlu': int(self.sol.nlu)}
+
+    def deployment_altitudes(self):
+        # Aberturas que acontecem durante a descida, em ordem de altitude decrescente: [(nome, altitude)]
+        aberturas = [('drogue', self.yd), ('reefing', self.yr), ('main', self.ym)]
+        return sorted([(nome, alt) for nome, alt in aberturas if 0 < alt < self.ap], key=lambda a: -a[1])
+
+    def deployment_times(self):
+        # Instante de cada abertura na última solução: {nome: t}
+        # Usa os instantes exatos registrados pelos eventos; na falta deles (ex: soluções antigas do cache),
+        # procura a altitude de abertura na trajetória compacta (dense = True) ou interpola linearmente as amostras da solução
+
+        if self.sol is None:
+            raise ValueError("Solução não calculada. Use solve() primeiro.")
+
+        aberturas = self.deployment_altitudes()
+        if self.deployments or not aberturas:
+            return {nome: float(t) for nome, (t, _) in self.deployments.items()}
+
+        alturas = [alt for _, alt in aberturas]
+        if self.trajectory is not None:
+            t = self.trajectory.at_altitude(alturas).t
+        else:
+            # Depois do apogeu y só diminui: interpola t(y) com y invertido (crescente)
+            t = np.interp(-np.asarray(alturas), -self.sol.y[0], self.sol.t)
+
+        return {nome: float(ti) for (nome, _), ti in zip(aberturas, t)}
+
+    def solve_segmented(self, dt = 0.001, t_max = 1000, method = 'RK45', rtol = 1e-6, atol = 1e-8, jac = True, dense = False, cache = None):
+        # Integração por fases: para em cada altitude de abertura com um evento do solve_ivp e reinicia a partir do estado no evento
+        # Dentro de cada fase k = cd*A é constante, as equações são suaves e um método explícito (RK45, DOP853) dá conta
+        # Isso evita pagar o Radau (implícito) no voo inteiro só por causa das descontinuidades em yd, yr e ym
+        # Os instantes e estados exatos de cada abertura ficam em self.deployments = {nome: (t, S)}
+        # dense, cache: ver solve (em cada abertura o instante aparece duas vezes, com a derivada antes e depois)
+
+        if cache is not None:
+            opcoes = {'modo': 'segmented', 'dt': dt, 't_max': t_max, 'method': method, 'rtol': rtol, 'atol': atol, 'jac': jac, 'dense': dense}
+            return self._solve_cached(cache, opcoes, lambda: self.solve_segmented(dt, t_max, method, rtol, atol, jac, dense))
+
+        t_eval = None if dense else np.arange(0, t_max, dt)
+
+        ground_event = lambda t, S: S[0]
+        ground_event.terminal = True
+        ground_event.direction = -1
+
+        # Altitudes onde a fase muda (aberturas na mesma altitude formam uma única fronteira)
+        aberturas = self.deployment_altitudes()
+        fronteiras = sorted({alt for _, alt in aberturas}, reverse=True)
+
+        # Com inflação k muda dentro de cada fase (rampa de enchimento): None --> calculado pela altitude com cdA
+        t0, S0 = 0.0, np.array([self.ap, 0, 0, 0], dtype=float)
+        k = None if self.inflation else self.cdA(self.ap)
+
+        ts, ys, yps = [], [], []
+        nfev = njev = nlu = 0
+        self.deployments = {}
+
+        for fronteira in fronteiras + [None]:
+            events = [ground_event]
+            if fronteira is not None:
+                phase_event = lambda t, S, a=fronteira: S[0] - a
+                phase_event.terminal = True
+                phase_event.direction = -1
+                events.append(phase_event)
+
+            # Pontos de saída desta fase (o primeiro ponto da fase já saiu na fase anterior)
+            t_eval_fase = None if dense else t_eval[(t_eval > t0) | ((t_eval == t0) & (t0 == 0))]
+
+            with self._stage('integracao'):
+                sol = solve_ivp(
+                    lambda t, S, k=k: self.dSdt(S, k),
+                    [t0, t_max],
+                    S0,
+                    t_eval=t_eval_fase,
+                    method=method,
+                    events=events,
+                    rtol=rtol,
+                    atol=atol,
+                    **self._jac_kwargs(method, jac, k)
+                )
+
+            ts.append(sol.t)
+            ys.append(np.reshape(sol.y, (len(S0), -1))) # Fase sem pontos de saída volta com y vazio
+            if dense:
+                yps.append(np.array([self.dSdt(S, k) for S in sol.y.T]).T)
+            nfev, njev, nlu = nfev + sol.nfev, njev + sol.njev, nlu + sol.nlu
+
+            # Chegou ao solo (ou t_max) antes da próxima abertura
+            if fronteira is None or sol.t_events[1].size == 0:
+                break
+
+            # Reinicia no estado exato da abertura, com o novo k
+            t0, S0 = sol.t_events[1][0], sol.y_events[1][0].copy()
+            S0[0] = fronteira
+            for nome, alt in aberturas:
+                if alt == fronteira:
+                    self.deployments[nome] = (t0, S0.copy())
+            k = None if self.inflation else self.cdA(fronteira)
+
+        self.sol = OptimizeResult(
+            t=np.concatenate(ts),
+            y=np.concatenate(ys, axis=1),
+            t_events=sol.t_events[:1],
+            y_events=sol.y_events[:1],
+            nfev=nfev,
+            njev=njev,
+            nlu=nlu,
+            status=sol.status,
+            message=sol.message,
+            success=sol.success,
+        )
+        self.trajectory = None
+
+        if dense:
+            self.sol.yp = np.concatenate(yps, axis=1)
+            self.trajectory = self._build_trajectory()
+
+    def stream(self, **opcoes):
+        # Simulação passo a passo (iterador de Steps), com ritmo de relógio e injeção de vento, estado e aberturas (ver stream.py)
+        from stream import StepStream
+        return StepStream(self, **opcoes)
+
+    def solve_terminal(self, n_pontos = 50):
+        # Modelo quase estacionário: em cada fase o foguete desce sempre na velocidade terminal local e deriva com o vento
+        #   v_t(y) = sqrt(2*m*g / (rho(y)*k)),   y_dot = vy(y) - v_t(y),   x_dot = vx(y)   (vento constante ou pelo perfil)
+        # O tempo vem de t(y) = integral de dy/|y_dot| (regra do trapézio numa grade de n_pontos altitudes por fase)
+        # Custa algumas centenas de microssegundos, contra dezenas/centenas de milissegundos da EDO completa
+        # A fase balística (foguete parado no apogeu, ar rarefeito) é a menos fiel; ver terminal_deviation para o erro
+        # A inflação dos paraquedas (DISTANCIA_INFLACAO_*) é ignorada: cada fase já começa com o paraquedas cheio
+
+        aberturas = self.deployment_altitudes()
+        fronteiras = [self.ap] + sorted({alt for _, alt in aberturas}, reverse=True) + [0.0]
+
+        # Grade de altitudes e k de cada fase (as fronteiras aparecem duas vezes: antes e depois da abertura)
+        y = np.concatenate([np.linspace(topo, base, n_pontos) for topo, base in zip(fronteiras[:-1], fronteiras[1:])])
+        k = np.repeat([self.cdA(topo) for topo in fronteiras[:-1]], n_pontos)
+
+        vx, vy = self.wind_at(y)
+        v_t = np.sqrt(2 * self.m * self.g / (self.atmosphere.rho(y) * k))
+        y_dot = vy - v_t
+        if np.any(y_dot >= 0):
+            raise ValueError("Vento vertical maior que a velocidade terminal: o modelo terminal não se aplica.")
+
+        # Tempo gasto em cada intervalo da grade (os intervalos de largura zero nas fronteiras não contam)
+        dy = -np.diff(y)
+        dt = dy * (1/2) * (1/-y_dot[:-1] + 1/-y_dot[1:])
+        t = np.concatenate([[0.0], np.cumsum(dt)])
+
+        # Deriva: integral de x_dot no tempo (regra do trapézio; com vento constante é só vx*t)
+        x_dot = np.broadcast_to(np.asarray(vx, dtype=float), y.shape).copy()
+        x = np.concatenate([[0.0], np.cumsum(dt * (1/2) * (x_dot[:-1] + x_dot[1:]))])
+
+        S = np.array([y, y_dot, x, x_dot])
+
+        self.deployments = {}
+        for nome, alt in aberturas:
+            i = fronteiras.index(alt) * n_pontos # Primeiro ponto da fase depois da abertura
+            self.deployments[nome] = (t[i], S[:, i].copy())
+
+        self.sol = OptimizeResult(
+            t=t,
+            y=S,
+            t_events=[t[-1:]],
+            y_events=[S[:, -1:].T],
+            nfev=0,
+            njev=0,
+            nlu=0,
+            status=1,
+            message='Modelo de velocidade terminal.',
+            success=True,
+        )
+
+    def terminal_deviation(self, method = 'RK45', rtol = 1e-6, atol = 1e-8):
+        # Compara o modelo terminal com a EDO completa (integração por fases) para a mesma configuração
+        # Retorna {grandeza: {'terminal', 'edo', 'desvio'}} para o ponto de pouso, tempo de voo, velocidade de impacto e aberturas
+        # Não altera self.sol
+
+        sol_antiga, aberturas_antigas = self.sol, self.deployments
+
+        resultados = []
+        for modo in ('terminal', 'edo'):
+            if modo == 'terminal':
+                self.solve_terminal()
+            else:
+                self.solve_segmented(dt=1000, method=method, rtol=rtol, atol=atol) # Só os eventos importam, sem grade de saída
+
+            t_solo, S_solo = self.sol.t_events[0][0], self.sol.y_events[0][0]
+            valores = {
+                't_voo': t_solo,
+                'x_final': S_solo[2],
+                'v_impacto': np.sqrt(S_solo[1]**2 + S_solo[3]**2),
+            }
+            for nome, (t_ab, _) in self.deployments.items():
+                valores[f't_{nome}'] = t_ab
+            resultados.append(valores)
+
+        self.sol, self.deployments = sol_antiga, aberturas_antigas
+
+        terminal, edo = resultados
+        return {
+            nome: {'terminal': float(terminal[nome]), 'edo': float(edo[nome]), 'desvio': float(terminal[nome] - edo[nome])}
+            for nome in edo
+        }
+
+    def solve_sensitivities(self, params=None, t_max=1000, method='DOP853', rtol=1e-8, atol=1e-8):
+        # Sensibilidades do pouso em relação aos parâmetros numa única integração (análise direta / forward sensitivity)
+        # Junto com o estado S integra s_p = dS/dp para cada parâmetro p:
+        #   ds_p/dt = J*s_p + df/dp        (J = jac, df/dp: dependência direta do lado direito em p)
+        # A integração é por fases, como em solve_segmented (k constante e equações suaves dentro de cada fase)
+        # Em cada abertura (y = a) o lado direito salta de f- para f+ sem salto no estado; o instante tau do evento depende de p:
+        #   dtau/dp = -(s_p[y] - da/dp) / f-[y]        s_p+ = s_p- + (f- - f+) * dtau/dp
+        # No solo (y = 0, t = T): dT/dp = -s_p[y]/y_dot, e as sensibilidades de x e da velocidade de impacto somam o efeito de dT
+        # Paraquedas com inflação finita não saltam (f- = f+) e a altitude de abertura deles entra pela rampa de k (ver cdA_partials)
+        # params: atributos (ver PARAMETROS_SENSIBILIDADE); None usa todos
+        # Retorna {'t_voo': {p: dT/dp}, 'x_final': {p: dx/dp}, 'v_impacto': {p: d|v|/dp}} (também fica em self.sensitivities)
+        # A solução nominal fica em self.sol e self.deployments, como em solve_segmented
+
+        params = list(params or self.PARAMETROS_SENSIBILIDADE)
+        for nome in params:
+            if nome not in self.PARAMETROS_SENSIBILIDADE:
+                raise ValueError(f"Sensibilidade em relação a '{nome}' não disponível. Use um de: {', '.join(self.PARAMETROS_SENSIBILIDADE)}.")
+
+        n = len(params)
+        indice = {nome: j for j, nome in enumerate(params)}
+
+        def derivadas(S, k, dk):
+            # Lado direito aumentado: f(S) e d(s)/dt para todos os parâmetros
+            # k, dk = None: k e dk/dp calculados pela altitude (inflação finita: k contínuo e sem saltos nas aberturas)
+            y, y_dot, x, x_dot, *_ = S
+            s = np.reshape(S[4:], (4, n))
+            if k is None:
+                k, dk = self.cdA(y), parciais_k(y)
+                J = self.jac(S[:4]) # Inclui dk/dy
+            else:
+                J = self.jac(S[:4], k)
+
+            Fx1, Fy1 = self.F_drag(S[:4], 1.0) # Arrasto por unidade de k
+            f = [y_dot, -self.g + k * Fy1 / self.m, x_dot, k * Fx1 / self.m]
+
+            fp = np.zeros((4, n))
+            fp[1] = Fy1 / self.m * dk
+            fp[3] = Fx1 / self.m * dk
+            if 'm' in indice:
+                fp[1, indice['m']] -= k * Fy1 / self.m**2
+                fp[3, indice['m']] -= k * Fx1 / self.m**2
+            if 'vx' in indice:
+                fp[1::2, indice['vx']] = -J[1::2, 3] # O arrasto depende de x_dot - vx (só as acelerações)
+            if 'vy' in indice:
+                fp[1::2, indice['vy']] = -J[1::2, 1]
+
+            return np.concatenate([f, (J @ s + fp).ravel()])
+
+        def parciais_k(y):
+            # dk/dp para os parâmetros pedidos, na fase que contém a altitude y
+            parciais = self.cdA_partials(y)
+            return np.array([parciais.get(nome, 0.0) for nome in params])
+
+        ground_event = lambda t, S: S[0]
+        ground_event.terminal = True
+        ground_event.direction = -1
+
+        aberturas = self.deployment_altitudes()
+        fronteiras = sorted({alt for _, alt in aberturas}, reverse=True)
+
+        # Estado inicial: só o apogeu mexe no estado inicial
+        s0 = np.zeros((4, n))
+        if 'ap' in indice:
+            s0[0, indice['ap']] = 1.0
+        t0, S0 = 0.0, np.concatenate([[self.ap, 0, 0, 0], s0.ravel()])
+        k, dk = (None, None) if self.inflation else (self.cdA(self.ap), parciais_k(self.ap))
+
+        ts, ys = [], []
+        nfev = 0
+        self.deployments = {}
+
+        for fronteira in fronteiras + [None]:
+            events = [ground_event]
+            if fronteira is not None:
+                phase_event = lambda t, S, a=fronteira: S[0] - a
+                phase_event.terminal = True
+                phase_event.direction = -1
+                events.append(phase_event)
+
+            with self._stage('integracao'):
+                sol = solve_ivp(
+                    lambda t, S, k=k, dk=dk: derivadas(S, k, dk),
+                    [t0, t_max],
+                    S0,
+                    method=method,
+                    events=events,
+                    rtol=rtol,
+                    atol=atol,
+                )
+
+            ts.append(sol.t)
+            ys.append(sol.y[:4])
+            nfev += sol.nfev
+
+            if fronteira is None or sol.t_events[1].size == 0:
+                break
+
+            # Condição de salto na abertura
+            t0, S0 = sol.t_events[1][0], sol.y_events[1][0].copy()
+            S0[0] = fronteira
+            s = np.reshape(S0[4:], (4, n))
+
+            if self.inflation:
+                # k é calculado pela altitude: f- usa o k logo acima da fronteira (paraquedas sem inflação desta fronteira ainda fechados)
+                # Paraquedas com rampa começam em f = 0 e não saltam; os de distância 0 abrem em degrau mesmo com inflação nos outros
+                k_novo, dk_novo = None, None
+                acima = np.nextafter(fronteira, np.inf)
+                f_antes = derivadas(S0, self.cdA(acima), parciais_k(acima))[:4]
+            else:
+                k_novo, dk_novo = self.cdA(fronteira), parciais_k(fronteira)
+                f_antes = derivadas(S0, k, dk)[:4]
+            f_depois = derivadas(S0, k_novo, dk_novo)[:4]
+
+            da = np.zeros(n) # d(altitude da fronteira)/dp, só dos paraquedas que abrem em degrau (o das rampas entra por cdA_partials)
+            for nome, alt in aberturas:
+                if alt == fronteira:
+                    self.deployments[nome] = (t0, S0[:4].copy())
+                    attr, distancia = {'drogue': ('yd', 'sD'), 'reefing': ('yr', 'sR'), 'main': ('ym', 'sM')}[nome]
+                    if attr in indice and getattr(self, distancia) <= 0:
+                        da[indice[attr]] = 1.0
+
+            dtau = -(s[0] - da) / f_antes[0]
+            s += np.outer(np.subtract(f_antes, f_depois), dtau)
+            S0[4:] = s.ravel()
+            k, dk = k_novo, dk_novo
+
+        self.sol = OptimizeResult(
+            t=np.concatenate(ts),
+            y=np.concatenate(ys, axis=1),
+            t_events=sol.t_events[:1],
+            y_events=[np.reshape(sol.y_events[0], (-1, len(S0)))[:, :4]],
+            nfev=nfev,
+            njev=0,
+            nlu=0,
+            status=sol.status,
+            message=sol.message,
+            success=sol.success,
+        )
+        self.trajectory = None
+
+        if sol.t_events[0].size == 0:
+            raise ValueError("O foguete não chegou ao solo antes de t_max; as sensibilidades do pouso não existem.")
+
+        # Sensibilidades no solo
+        S_solo = sol.y_events[0][0]
+        s = np.reshape(S_solo[4:], (4, n))
+        f = derivadas(S_solo, k, dk)[:4]
+        dT = -s[0] / f[0]
+        dx = s[2] + f[2] * dT
+        v = np.hypot(S_solo[1], S_solo[3])
+        dv = (S_solo[1] * (s[1] + f[1] * dT) + S_solo[3] * (s[3] + f[3] * dT)) / v
+
+        self.sensitivities = {
+            't_voo': dict(zip(params, dT.tolist())),
+            'x_final': dict(zip(params, dx.tolist())),
+            'v_impacto': dict(zip(params, dv.tolist())),
+        }
+        return self.sensitivities
+
+    def params(self):
+        # Todos os parâmetros da simulação: {nome no config.py: valor}
+        return {nome: getattr(self, attr) for nome, attr in self.CONFIG_ATTRS.items()}
+
+    @property
+    def config(self):
+        # Configuração atual como SimConfig (reflete atributos alterados depois da criação)
+        return self._config.replace(self.params())
+
+    def _solve_cached(self, cache, opcoes, resolver):
+        # Procura a solução no cache; se não achar, resolve e guarda
+        # opcoes: tudo o que define a solução além dos parâmetros físicos (modo, método, tolerâncias, grade de saída)
+
+        descricao = {'params': self.params(), 'opcoes': opcoes, 'modelo': MODELO}
+        if self.wind is not None:
+            descricao['vento'] = self.wind.digest() # Conteúdo do perfil (o arquivo pode mudar com o mesmo nome)
+
+        with self._stage('cache'):
+            key = cache.key(descricao)
+            entrada = cache.get(key)
+
+            if self.stats is not None:
+                self.stats.from_cache = entrada is not None
+            if entrada is not None:
+                self._load_cache_entry(entrada)
+                return
+
+        resolver()
+
+        with self._stage('cache'):
+            cache.put(key, self._cache_entry())
+
+    def _cache_entry(self):
+        # Última solução em formato de arrays para o cache (inclui os números do relatório)
+
+        entrada = {
+            't': self.sol.t,
+            'y': self.sol.y,
+            't_solo': np.asarray(self.sol.t_events[0]),
+            'y_solo': np.reshape(self.sol.y_events[0], (-1, 4)),
+            'contagens': np.array([self.sol.nfev, self.sol.njev, self.sol.nlu, self.sol.status]),
+            'resumo': np.array(json.dumps(self.summary())),
+            'aberturas': np.array(json.dumps({nome: [float(t), S.tolist()] for nome, (t, S) in self.deployments.items()})),
+        }
+        if 'yp' in self.sol:
+            entrada['yp'] = self.sol.yp
+        return entrada
+
+    def _load_cache_entry(self, entrada):
+        # Restaura self.sol, self.deployments e self.trajectory a partir de uma entrada do cache
+
+        nfev, njev, nlu, status = entrada['contagens'].tolist()
+        self.sol = OptimizeResult(
+            t=entrada['t'],
+            y=entrada['y'],
+            t_events=[entrada['t_solo']],
+            y_events=[entrada['y_solo']],
+            nfev=nfev,
+            njev=njev,
+            nlu=nlu,
+            status=status,
+            message='Solução lida do cache.',
+            success=status >= 0,
+            resumo=json.loads(str(entrada['resumo'])),
+        )
+        self.deployments = {nome: (t, np.array(S)) for nome, (t, S) in json.loads(str(entrada['aberturas'])).items()}
+
+        self.trajectory = None
+        if 'yp' in entrada:
+            self.sol.yp = entrada['yp']
+            self.trajectory = self._build_trajectory()
+
+    def summary(self):
+        # Principais resultados da última solução (mesmas contas do relatório)
+
+        if self.sol is None:
+            raise ValueError("Solução não calculada. Use solve() primeiro.")
+
+        if 'resumo' in self.sol:
+            return dict(self.sol.resumo) # Já calculado (solução lida do cache)
+
+        speed = np.sqrt(self.sol.y[1]**2 + self.sol.y[3]**2)
+        vx_final = self.sol.y[3, -1]
+        vy_final = self.sol.y[1, -1]
+
+        return {
+            't_voo': float(self.sol.t[-1]),
+            'x_final': float(self.sol.y[2, -1]),
+            'v_max': float(np.max(speed)),
+            'v_impacto': float(np.sqrt(vx_final**2 + vy_final**2)),
+        }
+
+class _InstrumentedSolver(Solver):
+    # Solver com a instrumentação ligada (ver Solver.enable_stats): cada método conta a chamada e chama o original
+
+    def _enter_phase(self, y):
+        # Fase do voo na altitude y: a última abertura com altitude >= y (ou balística, antes da primeira)
+        aberturas = self.deployment_altitudes()
+        alturas = [alt for _, alt in aberturas]
+        nomes = ['balistica'] + [nome for nome, _ in aberturas]
+        i = sum(y <= alt for alt in alturas)
+        self._faixa[0] = alturas[i] if i < len(alturas) else -float('inf')
+        self._faixa[1] = alturas[i - 1] if i > 0 else float('inf')
+        self.stats.enter_phase(nomes[i])
+
+    def dSdt(self, S, k=None):
+        stats = self.stats
+        stats.calls['dSdt'] += 1
+        y = S[0]
+        if stats.current_stage == 'integracao' and (not self._faixa[0] < y <= self._faixa[1] or stats.current_phase is None):
+            self._enter_phase(y)
+        return Solver.dSdt(self, S, k)
+
+    def F_drag(self, S, k=None):
+        self.stats.calls['F_drag'] += 1
+        return Solver.F_drag(self, S, k)
+
+    def rho(self, y):
+        self.stats.calls['rho'] += 1
+        return self.atmosphere.rho(y)
 
+    def dSdt_batch(self, S, p):
+        self.stats.calls['dSdt_batch'] += 1
+        return Solver.dSdt_batch(self, S, p)
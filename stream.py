@@ -0,0 +1,282 @@
+#stream.py
+
+# Simulação passo a passo, para acompanhar a descida enquanto ela é calculada (estação de solo, bancada com o computador de bordo)
+# Usa os integradores do SciPy por passo (RK45, Radau, ... com .step()) em vez do solve_ivp, que só retorna no fim da descida
+# A cada passo aceito (ou a cada dt de simulação) sai um Step com o instante, o estado e os paraquedas abertos
+
+# Entre passos dá para injetar:
+#   set_wind(vx, vy)   vento medido (constante a partir de agora, substitui o do config.py/perfil)
+#   deploy(nome)       abertura forçada de um paraquedas (sai um Step com o evento dele)
+#   set_state(...)     estado medido (y, y_dot, x, x_dot); se a nova altitude já está abaixo de uma abertura pendente,
+#                      esse paraquedas abre ali mesmo e sai um Step com o evento dele
+# As injeções podem vir de outra thread (ex: leitura de um sensor): ficam numa fila e valem a partir do último Step entregue
+
+# Custo por passo limitado: o passo do integrador é limitado por max_step, o instante de cada abertura e do pouso é
+# localizado pela saída densa do próprio passo, e nada é acumulado (memória constante ao longo do voo)
+
+# Exemplos:
+#   for passo in Solver().stream(dt=0.1, tempo_real=1.0):
+#       print(passo.t, passo.S[0], passo.paraquedas)
+#
+#   python stream.py --dt 0.5 --tempo-real 10            (uma linha JSON por Step)
+#   python stream.py --dt 0.5 --tempo-real 1 --comandos  (lê comandos JSON da entrada padrão: {"vento": [5, 0]}, {"abrir": "main"})
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import scipy.integrate
+from scipy.optimize import brentq
+
+from solver import Solver
+
+# Estado entregue a cada passo
+#   t           instante [s]
+#   S           estado [y, y_dot, x, x_dot] (cópia)
+#   paraquedas  paraquedas abertos, na ordem de abertura
+#   evento      'drogue', 'reefing', 'main' (abertura neste instante), 'solo' (pouso), 't_max' (fim sem pouso) ou None
+Step = namedtuple('Step', ['t', 'S', 'paraquedas', 'evento'])
+
+# Paraquedas --> (atributo da altitude de abertura, do cd, da área e da distância de inflação)
+PARAQUEDAS = {
+    'drogue': ('yd', 'cdD', 'AD', 'sD'),
+    'reefing': ('yr', 'cdR', 'AR', 'sR'),
+    'main': ('ym', 'cdM', 'AM', 'sM'),
+}
+
+class StepStream:
+    def __init__(self, solver, method='RK45', rtol=1e-6, atol=1e-8, max_step=1.0, dt=None, tempo_real=None, t_max=1000):
+        # solver: Solver com a configuração da descida (não é modificado: o stream usa uma cópia)
+        # method: integrador do SciPy ('RK45', 'DOP853', 'Radau', 'BDF', 'LSODA')
+        # max_step: maior passo de integração [s] --> limita o custo e o intervalo entre dois Steps
+        # dt: intervalo entre Steps [s de simulação] (estados interpolados); None entrega cada passo aceito
+        # tempo_real: fator de ritmo em relação ao relógio (1 = tempo real, 10 = dez vezes mais rápido); None não espera
+
+        if not hasattr(scipy.integrate, method):
+            raise ValueError(f"Método '{method}' desconhecido.")
+
+        # Cópia própria: o vento medido e as aberturas forçadas não mexem no Solver original
+        self.solver = Solver(solver.config, stats=solver.stats, wind=solver.wind)
+        self.method, self.rtol, self.atol, self.max_step = method, rtol, atol, max_step
+        self.dt, self.tempo_real, self.t_max = dt, tempo_real, t_max
+
+        # Estado atual (o do último Step entregue)
+        self.t = 0.0
+        self.S = np.array([self.solver.ap, 0, 0, 0], dtype=float)
+
+        # Paraquedas já abertos no apogeu (altitude de abertura acima dele, como em Solver.cdA)
+        # e altitude onde cada um abriu (de onde conta a inflação; numa abertura forçada, a altitude do momento)
+        self.paraquedas = [nome for nome, (alt, _, _, _) in PARAQUEDAS.items() if self.solver.ap <= getattr(self.solver, alt)]
+        self._altitude_abertura = {nome: getattr(self.solver, PARAQUEDAS[nome][0]) for nome in self.paraquedas}
+        self.terminado = False
+
+        # Injeções pendentes (aplicadas no início do próximo passo)
+        self._pendentes = []
+        self._stepper = None
+
+    def k(self, y):
+        # cd*A total na altitude y com os paraquedas abertos, cada um com a sua inflação (ver Solver.fill)
+        # O corpo do foguete conta até o drogue encher, como em Solver.cdA
+        s = self.solver
+        k = s.cdF * s.AF
+        for nome in self.paraquedas:
+            _, cd, area, distancia = PARAQUEDAS[nome]
+            f, _ = s.fill(self._altitude_abertura[nome] - y, getattr(s, distancia))
+            k += getattr(s, cd) * getattr(s, area) * f
+            if nome == 'drogue':
+                k -= s.cdF * s.AF * f
+        return k
+
+    def set_wind(self, vx, vy=0.0):
+        # Vento medido [m/s], constante a partir do próximo passo
+        self._pendentes.append(('vento', (float(vx), float(vy))))
+
+    def deploy(self, nome):
+        # Abre o paraquedas nome no próximo passo (sem efeito se já estiver aberto)
+        if nome not in PARAQUEDAS:
+            raise ValueError(f"Paraquedas '{nome}' desconhecido. Use um de: {', '.join(PARAQUEDAS)}.")
+        self._pendentes.append(('abrir', nome))
+
+    def set_state(self, y=None, y_dot=None, x=None, x_dot=None):
+        # Substitui componentes do estado (as que forem None ficam como estão)
+        self._pendentes.append(('estado', (y, y_dot, x, x_dot)))
+
+    def _apply_pending(self):
+        # Aplica as injeções da fila; qualquer uma reinicia o integrador (o lado direito muda de forma descontínua)
+        # Retorna os paraquedas abertos pelas injeções (forçados ou com a altitude de abertura pulada por um estado injetado)
+        reiniciar = False
+        abertos = []
+        while self._pendentes:
+            tipo, valor = self._pendentes.pop(0)
+            if tipo == 'vento':
+                self.solver.wind = None
+                self.solver.vx, self.solver.vy = valor
+            elif tipo == 'abrir':
+                if valor in self.paraquedas:
+                    continue
+                self.paraquedas.append(valor)
+                self._altitude_abertura[valor] = self.S[0]
+                abertos.append(valor)
+            else:
+                for i, componente in enumerate(valor):
+                    if componente is not None:
+                        self.S[i] = componente
+
+                # Aberturas pendentes que ficaram acima do novo estado: abrem agora (a inflação conta daqui)
+                for nome, (alt, _, _, _) in PARAQUEDAS.items():
+                    if nome not in self.paraquedas and 0 < getattr(self.solver, alt) and self.S[0] <= getattr(self.solver, alt):
+                        self.paraquedas.append(nome)
+                        self._altitude_abertura[nome] = self.S[0]
+                        abertos.append(nome)
+            reiniciar = True
+
+        if reiniciar or self._stepper is None:
+            self._restart()
+        return abertos
+
+    def _restart(self):
+        # Novo integrador a partir do estado atual, com o k dos paraquedas abertos
+        # Sem inflação k é constante até a próxima abertura; com inflação, é recalculado pela altitude (rampa de enchimento)
+        if self.solver.inflation:
+            k = lambda S: self.k(S[0])
+        else:
+            k_fase = self.k(self.S[0])
+            k = lambda S: k_fase
+        opcoes = {}
+        if self.method in Solver.METODOS_IMPLICITOS:
+            opcoes['jac'] = lambda t, S: self.solver.jac(S, k(S))
+        self._stepper = getattr(scipy.integrate, self.method)(
+            lambda t, S: self.solver.dSdt(S, k(S)),
+            self.t,
+            self.S,
+            self.t_max,
+            rtol=self.rtol,
+            atol=self.atol,
+            max_step=self.max_step,
+            **opcoes
+        )
+
+    def _next_target(self):
+        # Próxima altitude onde algo acontece (maior abertura pendente abaixo do estado atual, ou o solo): (altitude, nomes)
+        pendentes = [(getattr(self.solver, alt), nome) for nome, (alt, _, _, _) in PARAQUEDAS.items()
+                     if nome not in self.paraquedas and 0 < getattr(self.solver, alt) < self.S[0]]
+        if not pendentes:
+            return 0.0, ['solo']
+        alvo = max(alt for alt, _ in pendentes)
+        return alvo, [nome for alt, nome in pendentes if alt == alvo]
+
+    def _wait(self, t):
+        # Ritmo: espera o relógio chegar ao instante t da simulação
+        if self.tempo_real is not None:
+            espera = self._inicio + t / self.tempo_real - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+    def _emit(self, t, S, evento=None):
+        self._wait(t)
+        return Step(t, S.copy(), tuple(self.paraquedas), evento)
+
+    def __iter__(self):
+        self._inicio = time.perf_counter() - self.t / (self.tempo_real or 1)
+
+        # Instantes de saída (com dt): t_base + i*dt (sem acumular erro de arredondamento)
+        t_base, i_saida = self.t, 1
+        t_saida = t_base + self.dt if self.dt is not None else None
+
+        yield self._emit(self.t, self.S)
+
+        while not self.terminado:
+            for nome in self._apply_pending():
+                yield self._emit(self.t, self.S, nome)
+
+            t_ant = self.t
+            if self._stepper.status != 'running' or t_ant >= self.t_max:
+                break
+            with self.solver._stage('integracao'):
+                mensagem = self._stepper.step()
+            if self._stepper.status == 'failed':
+                raise RuntimeError(f"O integrador falhou em t = {t_ant:.3f} s: {mensagem}")
+
+            t_novo, S_novo = self._stepper.t, self._stepper.y
+            denso = self._stepper.dense_output()
+
+            # Abertura ou pouso dentro do passo: corta o passo no instante exato (saída densa do próprio passo)
+            alvo, nomes = self._next_target()
+            evento = None
+            if S_novo[0] <= alvo:
+                t_novo = brentq(lambda t: denso(t)[0] - alvo, t_ant, t_novo, xtol=1e-12)
+                S_novo = denso(t_novo)
+                S_novo[0] = alvo
+                evento = nomes
+
+            # Saídas: cada passo aceito, ou os instantes múltiplos de dt dentro do passo (interpolados)
+            interrompido = False
+            if self.dt is not None:
+                while t_saida < t_novo:
+                    self.t, self.S = t_saida, denso(t_saida)
+                    i_saida += 1
+                    t_saida = t_base + i_saida * self.dt
+                    yield self._emit(self.t, self.S)
+                    if self._pendentes: # Injeção: recomeça deste Step
+                        interrompido = True
+                        break
+            if interrompido:
+                self._stepper = None
+                continue
+
+            self.t, self.S = t_novo, np.array(S_novo)
+            if evento is None:
+                if self.t >= self.t_max:
+                    # Chegou a t_max ainda no ar: o último Step é marcado, para não ser confundido com um pouso
+                    self.terminado = True
+                    yield self._emit(self.t, self.S, 't_max')
+                elif self.dt is None:
+                    yield self._emit(self.t, self.S)
+                continue
+
+            if evento == ['solo']:
+                self.terminado = True
+                yield self._emit(self.t, self.S, 'solo')
+                break
+
+            self.paraquedas.extend(evento)
+            self._altitude_abertura.update((nome, alvo) for nome in evento)
+            self._stepper = None
+            for nome in evento:
+                yield self._emit(self.t, self.S, nome)
+
+def _read_commands(stream, entrada):
+    # Comandos JSON, um por linha: {"vento": [vx, vy]}, {"abrir": "main"}, {"estado": {"x_dot": 3}}
+    for linha in entrada:
+        if not linha.strip():
+            continue
+        try:
+            comando = json.loads(linha)
+            if 'vento' in comando:
+                stream.set_wind(*comando['vento'])
+            if 'abrir' in comando:
+                stream.deploy(comando['abrir'])
+            if 'estado' in comando:
+                stream.set_state(**comando['estado'])
+        except (ValueError, TypeError) as erro:
+            print(json.dumps({'erro': str(erro)}), file=sys.stderr)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulação passo a passo (uma linha JSON por Step)")
+    parser.add_argument('--metodo', default='RK45')
+    parser.add_argument('--dt', type=float, default=None, help="Intervalo entre Steps [s de simulação] (padrão: cada passo do integrador)")
+    parser.add_argument('--tempo-real', type=float, default=None, help="Fator de ritmo (1 = tempo real); padrão: sem espera")
+    parser.add_argument('--max-step', type=float, default=1.0, help="Maior passo de integração [s]")
+    parser.add_argument('--comandos', action='store_true', help="Lê comandos JSON da entrada padrão (vento, abrir, estado)")
+    args = parser.parse_args()
+
+    stream = Solver().stream(method=args.metodo, dt=args.dt, tempo_real=args.tempo_real, max_step=args.max_step)
+    if args.comandos:
+        threading.Thread(target=_read_commands, args=(stream, sys.stdin), daemon=True).start()
+
+    for passo in stream:
+        print(json.dumps({'t': passo.t, 'S': passo.S.tolist(), 'paraquedas': passo.paraquedas, 'evento': passo.evento}), flush=True)
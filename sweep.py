@@ -0,0 +1,182 @@
+#sweep.py
+
+# Varredura de parâmetros do config.py (grade ou hipercubo latino) rodando o Solver em paralelo
+# Cada ponto é uma execução independente do Solver, distribuída num pool de processos do tamanho do número de núcleos
+# Os resultados são gravados num CSV à medida que ficam prontos, então uma varredura interrompida continua de onde parou
+
+# Exemplos:
+#   python sweep.py --grid ALTURA_ABERTURA_MAIN=300:800:6 --grid AREA_MAIN=2,3,4
+#   python sweep.py --lhs ALTURA_ABERTURA_DROGUE=3000:12000 --lhs AREA_DROGUE=0.2:0.6 --amostras 200 --seed 1
+#   python sweep.py --grid AREA_MAIN=2:5:10 --metodo auto      (integrador calibrado para a varredura, ver autotune.py)
+
+# O integrador usado (modo, método e tolerâncias) fica gravado em cada linha; uma varredura só é retomada com o mesmo integrador
+
+import argparse
+import csv
+import hashlib
+import inspect
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy.stats import qmc
+
+from config import PATH_RESULTADOS
+from solver import Solver
+
+# Colunas de resultado gravadas para cada ponto
+COLUNAS_RESULTADO = ['t_voo', 'x_final', 'v_max', 'v_impacto']
+
+# Colunas do integrador usado em cada ponto
+COLUNAS_INTEGRADOR = ['modo', 'method', 'rtol', 'atol']
+
+def grid(valores):
+    # Produto cartesiano: {nome: lista de valores} --> lista de pontos {nome: valor}
+    nomes = list(valores)
+    return [dict(zip(nomes, combinacao)) for combinacao in itertools.product(*(valores[nome] for nome in nomes))]
+
+def latin_hypercube(limites, n, seed=None):
+    # Amostragem por hipercubo latino: {nome: (min, max)} --> lista de n pontos {nome: valor}
+    nomes = list(limites)
+    amostras = qmc.LatinHypercube(d=len(nomes), seed=seed).random(n)
+    amostras = qmc.scale(amostras, [limites[nome][0] for nome in nomes], [limites[nome][1] for nome in nomes])
+    return [{nome: float(valor) for nome, valor in zip(nomes, linha)} for linha in amostras]
+
+def point_id(ponto):
+    # Identificador estável de um ponto (usado para retomar varreduras interrompidas)
+    texto = json.dumps(ponto, sort_keys=True)
+    return hashlib.sha1(texto.encode()).hexdigest()[:16]
+
+def run_point(ponto, solve_kwargs=None):
+    # Roda o Solver para um ponto (executado nos processos do pool)
+    # solve_kwargs pode trazer 'modo': 'segmented' (integração por fases, ver autotune.py)
+    opcoes = dict(solve_kwargs or {})
+    solver = Solver(ponto)
+    (solver.solve_segmented if opcoes.pop('modo', 'solve') == 'segmented' else solver.solve)(**opcoes)
+    return solver.summary()
+
+def tune_points(pontos, n=3, orcamento=None, opcoes=None):
+    # Ajuste do integrador (ver autotune.py) calibrado em até n pontos espalhados pela varredura, válido para todos eles
+    # Calibrar cada ponto custaria mais que a varredura inteira; o ajuste precisa cumprir o orçamento em todos os pontos calibrados
+    # opcoes: opções de saída com que os pontos são resolvidos (a calibração mede o mesmo trabalho)
+    from autotune import tune
+    from simconfig import SimConfig
+
+    indices = sorted(set(np.linspace(0, len(pontos) - 1, min(n, len(pontos))).astype(int).tolist()))
+    return tune([SimConfig().replace(pontos[i]) for i in indices], orcamento, opcoes=opcoes)
+
+def integrator(pontos, solve_kwargs=None):
+    # Opções completas do solve de cada ponto, com o integrador explícito: method = 'auto' é calibrado aqui, uma vez
+    # (e não em cada processo), nos mesmos pontos e com as mesmas opções de saída em qualquer retomada
+
+    padrao = {nome: parametro.default for nome, parametro in inspect.signature(Solver.solve).parameters.items()
+              if nome in ('dt', 't_max', 'method', 'rtol', 'atol', 'jac', 'dense')}
+    opcoes = {'modo': 'solve', **padrao, **(solve_kwargs or {})}
+
+    if opcoes['method'] == 'auto':
+        saida = {nome: valor for nome, valor in opcoes.items() if nome not in COLUNAS_INTEGRADOR}
+        opcoes.update(tune_points(pontos, opcoes=saida))
+    return opcoes
+
+def sweep(pontos, path=None, workers=None, solve_kwargs=None):
+    # Roda todos os pontos num pool de processos e grava cada resultado no CSV assim que termina
+    # Pontos já presentes no CSV (mesmo id) são pulados; se foram calculados com outro integrador, nada é rodado (ValueError)
+    # Retorna o caminho do CSV
+
+    if path is None:
+        path = os.path.join(PATH_RESULTADOS, "varredura.csv")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    nomes = sorted({nome for ponto in pontos for nome in ponto})
+    colunas = ['id'] + nomes + COLUNAS_INTEGRADOR + COLUNAS_RESULTADO
+
+    # Pontos já calculados e o integrador de cada um
+    feitos = {}
+    if os.path.exists(path):
+        with open(path, newline='') as f:
+            leitor = csv.DictReader(f)
+            if leitor.fieldnames != colunas:
+                raise ValueError(f"O arquivo {path} tem colunas diferentes desta varredura.")
+            feitos = {linha['id']: [linha[nome] for nome in COLUNAS_INTEGRADOR] for linha in leitor}
+
+    pendentes = [ponto for ponto in pontos if point_id(ponto) not in feitos]
+    print(f"{len(pontos) - len(pendentes)} pontos já calculados, {len(pendentes)} pendentes")
+
+    if pendentes:
+        solve_kwargs = integrator(pontos, solve_kwargs)
+        usado = {nome: solve_kwargs[nome] for nome in COLUNAS_INTEGRADOR}
+        print(f"Integrador: {usado['modo']} {usado['method']} rtol={usado['rtol']:g} atol={usado['atol']:g}")
+
+        # Não mistura integradores no mesmo CSV
+        for integrador_ponto in feitos.values():
+            if integrador_ponto != [str(valor) for valor in usado.values()]:
+                raise ValueError(f"O arquivo {path} foi calculado com outro integrador ({', '.join(integrador_ponto)}); use outro arquivo de saída.")
+
+    novo = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        escritor = csv.DictWriter(f, fieldnames=colunas)
+        if novo:
+            escritor.writeheader()
+            f.flush()
+
+        if not pendentes:
+            return path
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            futuros = {pool.submit(run_point, ponto, solve_kwargs): ponto for ponto in pendentes}
+
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                ponto = futuros[futuro]
+                resultado = futuro.result()
+
+                escritor.writerow({'id': point_id(ponto), **ponto, **usado, **resultado})
+                f.flush() # Cada linha vai para o disco assim que fica pronta
+
+                print(f"[{i}/{len(pendentes)}] {ponto} --> {resultado}")
+
+    return path
+
+def _parse_grid(texto):
+    # NOME=a:b:n --> n valores igualmente espaçados entre a e b; NOME=v1,v2,... --> lista de valores
+    nome, valores = texto.split('=', 1)
+    if ':' in valores:
+        a, b, n = valores.split(':')
+        return nome, [float(v) for v in np.linspace(float(a), float(b), int(n))]
+    return nome, [float(v) for v in valores.split(',')]
+
+def _parse_lhs(texto):
+    # NOME=a:b --> intervalo da amostragem
+    nome, valores = texto.split('=', 1)
+    a, b = valores.split(':')
+    return nome, (float(a), float(b))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros do config.py")
+    parser.add_argument('--grid', action='append', default=[], help="NOME=a:b:n ou NOME=v1,v2,... (produto cartesiano)")
+    parser.add_argument('--lhs', action='append', default=[], help="NOME=a:b (hipercubo latino)")
+    parser.add_argument('--amostras', type=int, default=100, help="Número de pontos do hipercubo latino")
+    parser.add_argument('--seed', type=int, default=0, help="Semente do hipercubo latino (mantenha a mesma para retomar)")
+    parser.add_argument('--workers', type=int, default=None, help="Número de processos (padrão: número de núcleos)")
+    parser.add_argument('--saida', default=None, help="Arquivo CSV de saída")
+    parser.add_argument('--metodo', default='Radau', help="Método de integração do solve_ivp, ou 'auto' para calibrar o mais rápido que cumpre o orçamento de erro (ver autotune.py)")
+    args = parser.parse_args()
+
+    if args.grid and args.lhs:
+        parser.error("Use --grid ou --lhs, não os dois.")
+
+    if args.grid:
+        pontos = grid(dict(_parse_grid(g) for g in args.grid))
+    elif args.lhs:
+        pontos = latin_hypercube(dict(_parse_lhs(l) for l in args.lhs), args.amostras, seed=args.seed)
+    else:
+        parser.error("Informe pelo menos um --grid ou --lhs.")
+
+    for ponto in pontos:
+        for nome in ponto:
+            if nome not in Solver.CONFIG_ATTRS:
+                parser.error(f"Parâmetro '{nome}' não existe no config.py.")
+
+    path = sweep(pontos, path=args.saida, workers=args.workers, solve_kwargs={'method': args.metodo})
+    print(f"Resultados em: {path}")
@@ -0,0 +1,167 @@
+#trajectory.py
+
+# Trajetória compacta: guarda só os passos aceitos pelo integrador (t, S e dS/dt em cada passo)
+# Entre dois passos o estado é reconstruído por interpolação cúbica de Hermite (saída densa), só quando alguém pede
+# Isso substitui a grade fixa de t_eval (1 milhão de pontos com dt = 0.001) por alguns milhares de passos
+
+# No disco a trajetória vira uma pasta com arquivos .npy (abertos com memory-map) e um índice pequeno em JSON:
+#   t.npy   (n,)    instantes dos passos
+#   S.npy   (n, 4)  estados [y, y_dot, x, x_dot]
+#   dS.npy  (n, 4)  derivadas dSdt
+#   index.json      número de passos, tamanho dos blocos, instante inicial de cada bloco e metadados
+# window(t_ini, t_fim) usa o índice para achar os blocos e só lê do disco as linhas necessárias
+
+# Nas aberturas da integração por fases o mesmo instante aparece duas vezes (antes e depois da abertura, com derivadas diferentes)
+# A interpolação sempre usa o intervalo depois do instante repetido, então a descontinuidade da aceleração é respeitada
+
+import json
+import os
+
+import numpy as np
+from scipy.optimize import OptimizeResult
+
+class Trajectory:
+    def __init__(self, t, S, dS, meta=None):
+        # t: (n,), S: (n, 4), dS: (n, 4) --> podem ser arrays em memória ou memory-maps
+        # meta: dicionário serializável em JSON (altitudes de abertura, instantes dos eventos, etc)
+        self._t = t
+        self._S = S
+        self._dS = dS
+        self.meta = meta or {}
+
+    @classmethod
+    def from_steps(cls, t, y, yp, meta=None):
+        # A partir dos arrays no formato do solve_ivp: t (n,), y (4, n), yp (4, n)
+        return cls(np.ascontiguousarray(t), np.ascontiguousarray(np.transpose(y)), np.ascontiguousarray(np.transpose(yp)), meta)
+
+    def __len__(self):
+        return len(self._t)
+
+    @property
+    def t(self):
+        # Instantes dos passos aceitos
+        return np.asarray(self._t)
+
+    @property
+    def y(self):
+        # Estados nos passos aceitos, formato (4, n) como no solve_ivp
+        return np.asarray(self._S).T
+
+    def _hermite(self, tq):
+        # Interpolação cúbica de Hermite (estado e derivada nos dois extremos de cada passo)
+
+        t = np.asarray(self._t)
+        tq = np.clip(np.asarray(tq, dtype=float), t[0], t[-1])
+
+        i = np.clip(np.searchsorted(t, tq, side='right') - 1, 0, len(t) - 2)
+        t0, t1 = t[i], t[i + 1]
+        h = t1 - t0
+        s = np.where(h > 0, (tq - t0) / np.where(h > 0, h, 1), 0.0)
+
+        S0, S1 = np.asarray(self._S[i]), np.asarray(self._S[i + 1])
+        dS0, dS1 = np.asarray(self._dS[i]), np.asarray(self._dS[i + 1])
+
+        s = s[:, None]
+        h = h[:, None]
+        h00 = 2*s**3 - 3*s**2 + 1
+        h10 = s**3 - 2*s**2 + s
+        h01 = -2*s**3 + 3*s**2
+        h11 = s**3 - s**2
+
+        return h00 * S0 + h10 * h * dS0 + h01 * S1 + h11 * h * dS1
+
+    def resample(self, t):
+        # Estados nos instantes t (qualquer grade), no formato do solve_ivp: OptimizeResult com t (m,) e y (4, m)
+        t = np.asarray(t, dtype=float)
+        return OptimizeResult(t=t, y=self._hermite(t).T)
+
+    def resample_dt(self, dt):
+        # Grade uniforme com passo dt, do primeiro ao último passo (inclusive)
+        t = np.asarray(self._t)
+        return self.resample(np.append(np.arange(t[0], t[-1], dt), t[-1]))
+
+    def at_altitude(self, alturas):
+        # Estados quando o foguete passa por cada altitude pedida (na descida)
+        # Acha o passo que contém cada altitude e resolve y(t) = altura com algumas iterações de Newton na cúbica de Hermite
+
+        alturas = np.atleast_1d(np.asarray(alturas, dtype=float))
+        t = np.asarray(self._t)
+        y = np.asarray(self._S[:, 0])
+
+        # y é decrescente (exceto no apogeu, com y_dot = 0): busca em -y
+        i = np.clip(np.searchsorted(-y, -alturas, side='left') - 1, 0, len(t) - 2)
+        t0, t1 = t[i], t[i + 1]
+        y0, y1 = y[i], y[i + 1]
+
+        # Chute inicial linear e refinamento por Newton
+        tq = t0 + (t1 - t0) * np.clip((y0 - alturas) / np.where(y0 != y1, y0 - y1, 1), 0, 1)
+        for _ in range(4):
+            S = self._hermite(tq)
+            y_dot = np.where(S[:, 1] != 0, S[:, 1], -1e-12)
+            tq = np.clip(tq - (S[:, 0] - alturas) / y_dot, t0, t1)
+
+        return self.resample(tq)
+
+    def window(self, t_ini=None, t_fim=None):
+        # Trecho da trajetória entre t_ini e t_fim (inclui os passos vizinhos, para a interpolação continuar exata nas bordas)
+        # Numa trajetória aberta com load(mmap=True) só as linhas do trecho são lidas do disco
+
+        blocos = self.meta.get('_t_blocos')
+        bloco = self.meta.get('_bloco')
+        n = len(self._t)
+
+        def indice(tq, lado):
+            if blocos is None:
+                return int(np.searchsorted(self._t, tq, side=lado))
+            # Usa o índice para ler só o bloco que contém tq
+            b = max(int(np.searchsorted(blocos, tq, side='right')) - 1, 0)
+            ini = b * bloco
+            return ini + int(np.searchsorted(self._t[ini:ini + bloco + 1], tq, side=lado))
+
+        i = 0 if t_ini is None else max(indice(t_ini, 'right') - 1, 0)
+        j = n if t_fim is None else min(indice(t_fim, 'left') + 1, n)
+
+        meta = {chave: valor for chave, valor in self.meta.items() if not chave.startswith('_')}
+        return Trajectory(np.asarray(self._t[i:j]), np.asarray(self._S[i:j]), np.asarray(self._dS[i:j]), meta)
+
+    def save(self, path, bloco=65536):
+        # Grava a trajetória numa pasta (ver o formato no topo do arquivo) e retorna o caminho
+
+        os.makedirs(path, exist_ok=True)
+        t = np.asarray(self._t)
+
+        np.save(os.path.join(path, 't.npy'), t)
+        np.save(os.path.join(path, 'S.npy'), np.asarray(self._S))
+        np.save(os.path.join(path, 'dS.npy'), np.asarray(self._dS))
+
+        meta = {chave: valor for chave, valor in self.meta.items() if not chave.startswith('_')}
+        index = {
+            'n': len(t),
+            'colunas': ['y', 'y_dot', 'x', 'x_dot'],
+            'bloco': bloco,
+            't_blocos': t[::bloco].tolist(),
+            't_ini': float(t[0]),
+            't_fim': float(t[-1]),
+            'meta': meta,
+        }
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump(index, f)
+
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        # Abre uma trajetória gravada com save; com mmap=True nada é lido até ser usado
+
+        with open(os.path.join(path, 'index.json')) as f:
+            index = json.load(f)
+
+        modo = 'r' if mmap else None
+        t = np.load(os.path.join(path, 't.npy'), mmap_mode=modo)
+        S = np.load(os.path.join(path, 'S.npy'), mmap_mode=modo)
+        dS = np.load(os.path.join(path, 'dS.npy'), mmap_mode=modo)
+
+        meta = dict(index['meta'])
+        meta['_t_blocos'] = np.asarray(index['t_blocos'])
+        meta['_bloco'] = index['bloco']
+        return cls(t, S, dS, meta)
@@ -3,6 +3,7 @@
 #Visualizar
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib import animation
 from matplotlib.animation import FuncAnimation
 
 #Estilo
@@ -12,17 +13,157 @@ plt.style.use(['science', 'notebook', 'grid'])
 #Salvar
 import os
 import pathlib
-from config import PATH_RESULTADOS
+import subprocess
+from simconfig import SimConfig
+
+#Renderização em paralelo
+from concurrent.futures import ProcessPoolExecutor
+
+#Instrumentação
+from contextlib import nullcontext
+
+#Builds incrementais
+import hashlib
+import json
+
+# Número máximo de pontos desenhados em cada curva (ver _decimate)
+MAX_PONTOS_PLOT = 4000
+
+# Figuras do relatório: {método: (arquivo, séries usadas, usa as linhas de abertura)}
+# As séries listadas (e o estilo) formam a impressão digital de cada figura: ela só é redesenhada quando isso muda
+FIGURAS = {
+    'plot_trajectory': ("trajetoria.png", ('x', 'y'), True),
+    'plot_y_y_dot': ("altitude_velocidade.png", ('t', 'y', 'y_dot'), False),
+    'plot_velocity_components': ("componentes_velocidade.png", ('t', 'y_dot', 'x_dot'), False),
+    'plot_speed': ("velocidade_escalar.png", ('t', 'speed'), False),
+}
+
+# Arquivo (na pasta de resultados) com a impressão digital de cada figura já gerada
+MANIFESTO = ".figuras.json"
+
+def _style_digest():
+    # Hash do estilo atual do matplotlib (rcParams, sem o backend, que muda entre a janela e os processos de renderização)
+    estilo = sorted((nome, repr(valor)) for nome, valor in plt.rcParams.items() if not nome.startswith('backend'))
+    return hashlib.sha256(repr(estilo).encode()).hexdigest()
+
+def _code_digest(funcao):
+    # Hash do código de uma função de desenho: mudar o gráfico (título, cores, rótulos) também invalida a figura
+    codigo = funcao.__code__
+    constantes = [c for c in codigo.co_consts if not hasattr(c, 'co_code')]
+    return hashlib.sha256(codigo.co_code + repr(constantes).encode()).hexdigest()
+
+def _decimate(series, n_max):
+    # Decimação mín/máx que preserva a forma das curvas
+    # Divide as amostras em blocos e, em cada bloco, guarda os índices do mínimo e do máximo de cada série
+    # Picos e saltos continuam aparecendo no gráfico, e o número de pontos fica limitado a ~n_max
+    # series: lista de arrays do mesmo tamanho; retorna os índices escolhidos (ordenados)
+
+    n = len(series[0])
+    n_blocos = max(n_max // (2 * len(series)), 1)
+    if n <= n_max:
+        return np.arange(n)
+
+    tamanho = -(-n // n_blocos) # Teto da divisão
+    n_util = (n // tamanho) * tamanho
+    base = np.arange(0, n_util, tamanho)
+
+    indices = [np.array([0, n - 1])]
+    for s in series:
+        blocos = s[:n_util].reshape(-1, tamanho)
+        indices.append(base + np.argmin(blocos, axis=1))
+        indices.append(base + np.argmax(blocos, axis=1))
+        # Resto que não completa um bloco
+        if n_util < n:
+            resto = s[n_util:]
+            indices.append(np.array([n_util + np.argmin(resto), n_util + np.argmax(resto)]))
+
+    return np.unique(np.concatenate(indices))
+
+def _render(visualizer, metodo):
+    # Executado nos processos do pool: desenha e salva uma figura num backend sem janela (Agg)
+    plt.switch_backend('Agg')
+    return getattr(visualizer, metodo)(save=True)
 
 class Visualizer:
-    def __init__(self):
+    def __init__(self, stats=None, config=None):
+        # stats: Stats (ver instrumentation.py) para cronometrar as etapas do relatório
+        # Se for None, usa o do Solver carregado (quando a instrumentação dele estiver ligada)
+        # config: SimConfig (ver simconfig.py) de onde vem a pasta de resultados; None usa a do config.py
+        self.stats = stats
+
         # Variáveis a serem usadas
         self.solver = None
         self.sol = None
         self.fig = None
         self.ax = None
-        self.results_dir = PATH_RESULTADOS
+        self.results_dir = (config or SimConfig()).PATH_RESULTADOS
+
+        # Séries derivadas e decimadas, calculadas uma vez em load_solution
+        self.series = None
+        self.aberturas = []
+
+    def __getstate__(self):
+        # Para mandar o Visualizer aos processos de renderização: só as séries decimadas e as aberturas (sem solver nem solução completa)
+        estado = self.__dict__.copy()
+        estado.update(solver=None, sol=None, fig=None, ax=None, stats=None)
+        return estado
+
+    def _stage(self, nome):
+        # Cronometra uma etapa quando a instrumentação está ligada
+        return self.stats.stage(nome) if self.stats is not None else nullcontext()
         
+    def fingerprint(self, metodo, estilo=None):
+        # Impressão digital de uma figura: séries que ela desenha, linhas de abertura, estilo e código da função de desenho
+        arquivo, nomes, usa_aberturas = FIGURAS[metodo]
+        h = hashlib.sha256()
+        for nome in nomes:
+            h.update(np.ascontiguousarray(self.series[nome]).tobytes())
+        if usa_aberturas:
+            h.update(repr(self.aberturas).encode())
+        h.update((estilo or _style_digest()).encode())
+        h.update(_code_digest(getattr(Visualizer, metodo)).encode())
+        h.update(arquivo.encode())
+        return h.hexdigest()
+
+    def _animation_fingerprint(self):
+        # Impressão digital da animação: solução completa (de onde os quadros são interpolados), aberturas, estilo e código
+        h = hashlib.sha256()
+        for array in (self.sol.t, self.sol.y):
+            h.update(np.ascontiguousarray(array).tobytes())
+        h.update(repr(self.aberturas).encode())
+        h.update(_style_digest().encode())
+        h.update(_code_digest(Visualizer.animate_trajectory).encode())
+        return h.hexdigest()
+
+    def _read_manifest(self):
+        # Impressões digitais das figuras já geradas nesta pasta ({arquivo: hash})
+        try:
+            with open(os.path.join(self.results_dir, MANIFESTO)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifesto):
+        with open(os.path.join(self.results_dir, MANIFESTO), 'w') as f:
+            json.dump(manifesto, f, indent=2)
+
+    def _up_to_date(self, manifesto, arquivo, impressao):
+        # A figura existe e foi gerada com as mesmas entradas
+        return manifesto.get(arquivo) == impressao and os.path.exists(os.path.join(self.results_dir, arquivo))
+
+    def deployment_events(self):
+        # Aberturas para o relatório: [(legenda, t, vy)] com os instantes e estados exatos dos eventos do Solver
+        # Sem eles (ex: soluções antigas do cache), usa os instantes de Solver.deployment_times e interpola vy na solução
+        legendas = {'drogue': 'Abertura Drogue', 'reefing': 'Abertura Reefing', 'main': 'Abertura Main'}
+        eventos = []
+        for nome, t in sorted(self.solver.deployment_times().items(), key=lambda item: item[1]):
+            if nome in self.solver.deployments:
+                vy = self.solver.deployments[nome][1][1]
+            else:
+                vy = np.interp(t, self.sol.t, self.sol.y[1])
+            eventos.append((legendas[nome], t, vy))
+        return eventos
+
     def _save_figure(self, filename):
         # Salvar figura no diretório
         os.makedirs(self.results_dir, exist_ok=True)
@@ -31,32 +172,72 @@ class Visualizer:
         plt.close()
         return path
         
-    def load_solution(self, solver):
+    def load_solution(self, solver, trajectory=None, t_ini=None, t_fim=None, n_pontos=2000):
         # Carregar solução
+        # Se houver trajetória compacta (solve com dense=True, ou trajectory aberta com Trajectory.load),
+        # usa só o trecho [t_ini, t_fim] reamostrado em n_pontos instantes, sem carregar a trajetória inteira
         self.solver = solver
         self.sol = solver.sol
 
-        # S = [y, y_dot, x, x_dot] --> Pra lembrar
+        if self.stats is None:
+            self.stats = solver.stats
+
+        if trajectory is None:
+            trajectory = solver.trajectory
+
+        with self._stage('series'):
+            if trajectory is not None:
+                trecho = trajectory.window(t_ini, t_fim)
+                t_ini = trecho.t[0] if t_ini is None else max(t_ini, trecho.t[0])
+                t_fim = trecho.t[-1] if t_fim is None else min(t_fim, trecho.t[-1])
+                self.sol = trecho.resample(np.linspace(t_ini, t_fim, n_pontos))
+
+            # S = [y, y_dot, x, x_dot] --> Pra lembrar
+
+            self._prepare_series()
+
+    def _prepare_series(self):
+        # Calcula as séries derivadas (velocidade escalar) uma única vez e as versões decimadas usadas nos gráficos
+
+        t, S = self.sol.t, self.sol.y
+        self.speed = np.sqrt(S[1]**2 + S[3]**2)
+
+        idx = _decimate([S[0], S[1], S[2], S[3], self.speed], MAX_PONTOS_PLOT)
+        self.series = {
+            't': t[idx],
+            'y': S[0, idx],
+            'y_dot': S[1, idx],
+            'x': S[2, idx],
+            'x_dot': S[3, idx],
+            'speed': self.speed[idx],
+        }
+
+        # Linhas de abertura de cada paraquedas: (altitude, cor, legenda)
+        self.aberturas = [
+            (alt, cor, legenda)
+            for alt, cor, legenda in (
+                (self.solver.yd, 'r', 'Abertura Drogue'),
+                (self.solver.yr, 'g', 'Abertura Reefing'),
+                (self.solver.ym, 'b', 'Abertura Main'),
+            )
+            if alt < self.solver.ap
+        ]
         
     def plot_trajectory(self, save=False):
         # Plot da trajetória y(x)
 
-        if self.sol is None:
+        if self.series is None:
             raise ValueError("Solução não carregada. Use load_solution() primeiro.")
             
         plt.figure(figsize=(10, 6))
-        plt.plot(self.sol.y[2], self.sol.y[0])
+        plt.plot(self.series['x'], self.series['y'])
         plt.title('Trajetória do Paraquedas')
         plt.xlabel('x (m)')
         plt.ylabel('y (m)')
         
         # Marcar abertura de cada paraquedas
-        if self.solver.yd < self.solver.ap:
-            plt.axhline(y=self.solver.yd, color='r', linestyle='--', label='Abertura Drogue')
-        if self.solver.yr < self.solver.ap:
-            plt.axhline(y=self.solver.yr, color='g', linestyle='--', label='Abertura Reefing')
-        if self.solver.ym < self.solver.ap:
-            plt.axhline(y=self.solver.ym, color='b', linestyle='--', label='Abertura Main')
+        for alt, cor, legenda in self.aberturas:
+            plt.axhline(y=alt, color=cor, linestyle='--', label=legenda)
         
         plt.legend()
         
@@ -68,7 +249,7 @@ class Visualizer:
     def plot_y_y_dot(self, save=False):
         # Plot da altitude (y) e velocidade (y_dot)
 
-        if self.sol is None:
+        if self.series is None:
             raise ValueError("Solução não carregada. Use load_solution() primeiro.")
             
         fig, ax1 = plt.subplots(figsize=(10, 6))
@@ -77,7 +258,7 @@ class Visualizer:
         color = 'tab:blue'
         ax1.set_xlabel('t (s)')
         ax1.set_ylabel('y (m)', color=color)
-        ax1.plot(self.sol.t, self.sol.y[0], color=color)
+        ax1.plot(self.series['t'], self.series['y'], color=color)
         ax1.tick_params(axis='y', labelcolor=color)
         ax1.grid(True)
         
@@ -85,7 +266,7 @@ class Visualizer:
         ax2 = ax1.twinx()
         color = 'tab:red'
         ax2.set_ylabel(r'$\dot{y}$ (m/s)', color=color)
-        ax2.plot(self.sol.t, self.sol.y[1], color=color)
+        ax2.plot(self.series['t'], self.series['y_dot'], color=color)
         ax2.tick_params(axis='y', labelcolor=color)
         
         plt.title('Altitude e Velocidade Vertical')
@@ -99,12 +280,12 @@ class Visualizer:
     def plot_velocity_components(self, save=False):
         # Plot da velocidade horizontal e vertical
 
-        if self.sol is None:
+        if self.series is None:
             raise ValueError("Solução não carregada. Use load_solution() primeiro.")
             
         plt.figure(figsize=(10, 6))
-        plt.plot(self.sol.t, self.sol.y[1], label=r'$\dot{y}$ (m/s)')
-        plt.plot(self.sol.t, self.sol.y[3], label=r'$\dot{x}$ (m/s)')
+        plt.plot(self.series['t'], self.series['y_dot'], label=r'$\dot{y}$ (m/s)')
+        plt.plot(self.series['t'], self.series['x_dot'], label=r'$\dot{x}$ (m/s)')
         plt.title('Componentes de Velocidade')
         plt.xlabel('t (s)')
         plt.ylabel('Velocidade (m/s)')
@@ -119,13 +300,11 @@ class Visualizer:
     def plot_speed(self, save=False):
         # Plot da normal da velocidade
 
-        if self.sol is None:
+        if self.series is None:
             raise ValueError("Solução não carregada. Use load_solution() primeiro.")
-            
-        speed = np.sqrt(self.sol.y[1]**2 + self.sol.y[3]**2)
         
         plt.figure(figsize=(10, 6))
-        plt.plot(self.sol.t, speed)
+        plt.plot(self.series['t'], self.series['speed'])
         plt.title('Velocidade Escalar')
         plt.xlabel('t (s)')
         plt.ylabel('Velocidade (m/s)')
@@ -136,38 +315,40 @@ class Visualizer:
         else:
             return plt.gcf()
 
-    def animate_trajectory(self, interval=50, save = False):
+    def animate_trajectory(self, duration=10, fps=20, save=False, filename="animacao_trajetoria.gif", dpi=80):
         #Cria uma animação da trajetória do paraquedas.
-        #interval (int): Intervalo entre frames em milissegundos
+        #duration (float): duração da animação em segundos; fps (int): quadros por segundo
+        #O número de quadros é duration*fps, não o número de amostras da solução (que pode passar de 1 milhão)
+        #Os estados de cada quadro são interpolados da solução, e o rastro cresce um quadro por vez
+        #Ao salvar, os quadros vão direto para o arquivo (.gif ou .mp4) sem ficar todos na memória
 
-        #Não sei o que ta acontecendo, mas não funciona por enquanto
-        
         if self.sol is None:
             raise ValueError("Solução não carregada. Use load_solution() primeiro.")
-            
+
+        # Estados nos instantes de cada quadro
+        n_quadros = max(int(round(duration * fps)), 2)
+        t = np.linspace(self.sol.t[0], self.sol.t[-1], n_quadros)
+        x, y, x_dot, y_dot = (np.interp(t, self.sol.t, self.sol.y[i]) for i in (2, 0, 3, 1))
+
         self.fig, self.ax = plt.subplots(figsize=(10, 6))
-        self.ax.set_xlim(min(self.sol.y[2]), max(self.sol.y[2]) + 1)
-        self.ax.set_ylim(0, max(self.sol.y[0]) + 100)
+        self.ax.set_xlim(min(np.min(x), 0), np.max(x) + 1)
+        self.ax.set_ylim(0, np.max(y) + 100)
         self.ax.set_xlabel('Posição Horizontal (m)')
         self.ax.set_ylabel('Altitude (m)')
         self.ax.set_title('Trajetória do Paraquedas')
         self.ax.grid(True)
         
-        # Linha completa da trajetória
+        # Rastro da trajetória
         line, = self.ax.plot([], [], 'b-', alpha=0.5)
         # Ponto atual da simulação
         point, = self.ax.plot([], [], 'ro')
         # Texto com informações
         time_text = self.ax.text(0.02, 0.95, '', transform=self.ax.transAxes)
-        info_text = self.ax.text(0.02, 0.90, '', transform=self.ax.transAxes)
+        info_text = self.ax.text(0.02, 0.90, '', transform=self.ax.transAxes, va='top')
         
         # Marca abertura de cada paraquedas
-        if self.solver.yd < self.solver.ap:
-            self.ax.axhline(y=self.solver.yd, color='r', linestyle='--', alpha=0.5)
-        if self.solver.yr < self.solver.ap:
-            self.ax.axhline(y=self.solver.yr, color='g', linestyle='--', alpha=0.5)
-        if self.solver.ym < self.solver.ap:
-            self.ax.axhline(y=self.solver.ym, color='b', linestyle='--', alpha=0.5)
+        for alt, cor, _ in self.aberturas:
+            self.ax.axhline(y=alt, color=cor, linestyle='--', alpha=0.5)
         
         def init():
             line.set_data([], [])
@@ -177,44 +358,114 @@ class Visualizer:
             return line, point, time_text, info_text
         
         def update(frame):
-            # Atualiza trajetória
-            x_data = self.sol.y[2, :frame]
-            y_data = self.sol.y[0, :frame]
-            line.set_data(x_data, y_data)
+            # Rastro até o quadro atual (visões dos arrays dos quadros, sem cópia)
+            line.set_data(x[:frame + 1], y[:frame + 1])
             
             # Atualiza ponto atual
-            point.set_data(self.sol.y[2, frame], self.sol.y[0, frame])
+            point.set_data([x[frame]], [y[frame]])
             
             # Atualiza informações
-            time_text.set_text(f'Tempo: {self.sol.t[frame]:.2f}s')
-            info = (f'Altitude: {self.sol.y[0, frame]:.2f}m\n'
-                    f'Vel. Vertical: {self.sol.y[1, frame]:.2f}m/s\n'
-                    f'Vel. Horizontal: {self.sol.y[3, frame]:.2f}m/s')
+            time_text.set_text(f'Tempo: {t[frame]:.2f}s')
+            info = (f'Altitude: {y[frame]:.2f}m\n'
+                    f'Vel. Vertical: {y_dot[frame]:.2f}m/s\n'
+                    f'Vel. Horizontal: {x_dot[frame]:.2f}m/s')
             info_text.set_text(info)
             
             return line, point, time_text, info_text
-        
-        ani = FuncAnimation(
-            self.fig, 
-            update, 
-            frames=len(self.sol.t),
-            init_func=init,
-            blit=True,
-            interval=interval
-        )
-        
+
+        if not save:
+            return FuncAnimation(
+                self.fig, 
+                update, 
+                frames=n_quadros,
+                init_func=init,
+                blit=True,
+                interval=1000/fps
+            )
+
         # Salva a animação
-        if save:
-            # Garante que o diretório existe
-            os.makedirs(self.results_dir, exist_ok=True)
-            ani.save(self.results_dir, writer='pillow', fps=1000/interval)
-            plt.close()
-            return self.results_dir
-        else:
-            return ani
+        os.makedirs(self.results_dir, exist_ok=True)
+        path = os.path.join(self.results_dir, filename)
+
+        # O fundo (eixos, grade, linhas de abertura) é desenhado uma vez só; em cada quadro só o rastro, o ponto e os textos são redesenhados
+        self.fig.set_dpi(dpi)
+        canvas = self.fig.canvas
+        init()
+        canvas.draw()
+        fundo = canvas.copy_from_bbox(self.fig.bbox)
+        largura, altura = canvas.get_width_height()
+
+        def quadros():
+            # Gera os quadros um por um (bytes RGBA)
+            for frame in range(n_quadros):
+                canvas.restore_region(fundo)
+                for artista in update(frame):
+                    self.ax.draw_artist(artista)
+                yield bytes(canvas.buffer_rgba())
+
+        try:
+            if animation.writers.is_available('ffmpeg'):
+                self._save_ffmpeg(quadros(), largura, altura, path, fps)
+            elif path.endswith('.gif'):
+                self._save_gif(quadros(), largura, altura, path, fps)
+            else:
+                raise RuntimeError("Salvar em vídeo precisa do ffmpeg instalado. Use um arquivo .gif.")
+        finally:
+            plt.close(self.fig)
+
+        return path
+
+    def _save_ffmpeg(self, quadros, largura, altura, path, fps):
+        # Manda cada quadro para o ffmpeg por um pipe (memória constante); o formato sai da extensão (.mp4, .gif, ...)
+        comando = [
+            plt.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{largura}x{altura}', '-r', str(fps), '-i', '-',
+        ]
+        if path.endswith('.mp4'):
+            comando += ['-vcodec', 'libx264', '-pix_fmt', 'yuv420p', '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2']
+        comando.append(path)
 
-    def generate_report(self, report_path=None, generate_animation=False):
+        proc = subprocess.Popen(comando, stdin=subprocess.PIPE)
+        try:
+            for quadro in quadros:
+                proc.stdin.write(quadro)
+        finally:
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"O ffmpeg falhou ao gravar {path}.")
+
+    def _save_gif(self, quadros, largura, altura, path, fps):
+        # Grava o GIF com o Pillow um quadro por vez, direto no arquivo (memória constante)
+        # Os quadros usam uma paleta fixa de 216 cores (6 níveis por canal), calculada com NumPy
+
+        from PIL import Image, GifImagePlugin
+
+        niveis = np.arange(6, dtype=np.uint8) * 51
+        paleta = np.stack(np.meshgrid(niveis, niveis, niveis, indexing='ij'), axis=-1).reshape(-1, 3).tobytes()
+
+        def imagem(quadro):
+            rgb = np.frombuffer(quadro, dtype=np.uint8).reshape(altura, largura, 4)[..., :3]
+            q = (rgb.astype(np.uint16) + 25) // 51
+            im = Image.fromarray((q[..., 0] * 36 + q[..., 1] * 6 + q[..., 2]).astype(np.uint8), 'P')
+            im.putpalette(paleta)
+            return im
+
+        with open(path, 'wb') as f:
+            primeiro = imagem(next(quadros))
+            cabecalho, _ = GifImagePlugin.getheader(primeiro, info={'loop': 0, 'optimize': False})
+            f.writelines(cabecalho)
+
+            f.writelines(GifImagePlugin.getdata(primeiro, duration=int(1000 / fps)))
+            for quadro in quadros:
+                f.writelines(GifImagePlugin.getdata(imagem(quadro), duration=int(1000 / fps)))
+
+            f.write(b';') # Fim do GIF
+
+    def generate_report(self, report_path=None, generate_animation=False, workers=None, force=False):
         #Gera um relatório markdown com resumo e links para as figuras
+        #As figuras são desenhadas ao mesmo tempo num pool de processos (padrão: um por núcleo; workers=1 desenha tudo neste processo)
+        #Build incremental: cada figura (e a animação) só é redesenhada se a impressão digital dela mudou (ver fingerprint),
+        #e o relatorio.md só é reescrito se o texto mudou; force=True redesenha tudo
 
         if self.sol is None:
             raise ValueError("Solução não carregada. Use load_solution() primeiro.")
@@ -232,11 +483,22 @@ class Visualizer:
         vel_comp_path = os.path.join(self.results_dir, "componentes_velocidade.png")
         speed_path = os.path.join(self.results_dir, "velocidade_escalar.png")
         anim_path = os.path.join(self.results_dir, "animacao_trajetoria.gif")
+
+        # Figuras cujas entradas mudaram desde o último relatório nesta pasta
+        manifesto = self._read_manifest()
+        estilo = _style_digest()
+        impressoes = {metodo: self.fingerprint(metodo, estilo) for metodo in FIGURAS}
+        figuras = [metodo for metodo in FIGURAS if force or not self._up_to_date(manifesto, FIGURAS[metodo][0], impressoes[metodo])]
         
+        # Começa a desenhar as figuras enquanto o texto é montado
+        workers = min(workers or os.cpu_count() or 1, len(figuras))
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        if pool is not None:
+            futuros = [pool.submit(_render, self, metodo) for metodo in figuras]
+
         # Calcula resultados
         t_total = self.sol.t[-1]
-        speed = np.sqrt(self.sol.y[1]**2 + self.sol.y[3]**2)
-        v_max = np.max(speed)
+        v_max = np.max(self.speed)
         x_final = self.sol.y[2, -1]
         y_max = np.max(self.sol.y[0])
         vx_final = self.sol.y[3, -1]
@@ -244,25 +506,8 @@ class Visualizer:
         v_final = np.sqrt(vx_final**2 + vy_final**2)
         impact_angle = np.degrees(np.arctan2(vy_final, vx_final))
         
-        # Coleta eventos (abertura de cada paraquedas)
-        events = []
-        if self.solver.yd < self.solver.ap:
-            idx_yd = np.argmax(self.sol.y[0] <= self.solver.yd)
-            t_yd = self.sol.t[idx_yd]
-            vy_yd = self.sol.y[1, idx_yd]
-            events.append(f"- Abertura Drogue: {t_yd:.2f}s (vy = {vy_yd:.2f} m/s)")
-            
-        if self.solver.yr < self.solver.ap:
-            idx_yr = np.argmax(self.sol.y[0] <= self.solver.yr)
-            t_yr = self.sol.t[idx_yr]
-            vy_yr = self.sol.y[1, idx_yr]
-            events.append(f"- Abertura Reefing: {t_yr:.2f}s (vy = {vy_yr:.2f} m/s)")
-            
-        if self.solver.ym < self.solver.ap:
-            idx_ym = np.argmax(self.sol.y[0] <= self.solver.ym)
-            t_ym = self.sol.t[idx_ym]
-            vy_ym = self.sol.y[1, idx_ym]
-            events.append(f"- Abertura Main: {t_ym:.2f}s (vy = {vy_ym:.2f} m/s)")
+        # Coleta eventos (abertura de cada paraquedas), com os instantes exatos dos eventos do Solver
+        events = [f"- {legenda}: {t:.2f}s (vy = {vy:.2f} m/s)" for legenda, t, vy in self.deployment_events()]
         
         # Gera conteúdo Markdown
         md_content = f"""
@@ -313,18 +558,50 @@ class Visualizer:
 ![Animação da Trajetória]({os.path.basename(anim_path)})
 """
         
-        # Salva o relatório
-        with open(report_path, 'w') as f:
-            f.write(md_content)
-        
-        # Gera as figuras
-        self.plot_trajectory(save=True)
-        self.plot_y_y_dot(save=True)
-        self.plot_velocity_components(save=True)
-        self.plot_speed(save=True)
+        # Gera as figuras (ou espera as que estão sendo geradas no pool)
+        with self._stage('figuras'):
+            if pool is None:
+                for metodo in figuras:
+                    with self._stage(f'figuras/{metodo}'):
+                        getattr(self, metodo)(save=True)
+            else:
+                for futuro in futuros:
+                    futuro.result()
+                pool.shutdown()
+
+            for metodo in figuras:
+                manifesto[FIGURAS[metodo][0]] = impressoes[metodo]
         
-        # Gera animação se solicitado (Beeeeem mais demorado)
+        # Gera animação se solicitado (alguns segundos)
         if generate_animation:
-            self.animate_trajectory(save = True)
+            with self._stage('animacao'):
+                impressao = self._animation_fingerprint()
+                if force or not self._up_to_date(manifesto, os.path.basename(anim_path), impressao):
+                    self.animate_trajectory(save = True)
+                    manifesto[os.path.basename(anim_path)] = impressao
+
+        self._write_manifest(manifesto)
+
+        # Desempenho (com a instrumentação ligada): os tempos mudam a cada execução, então ficam em desempenho.md
+        # e o relatório só leva o link (senão ele seria reescrito sempre e o build incremental nunca pularia a escrita)
+        desempenho_path = os.path.join(os.path.dirname(report_path), "desempenho.md")
+        if self.stats is not None:
+            md_content += f"\n## Desempenho\nMedidas da última execução em [{os.path.basename(desempenho_path)}]({os.path.basename(desempenho_path)}).\n"
+        
+        # Salva o relatório (só se o texto mudou)
+        with self._stage('escrita'):
+            try:
+                with open(report_path) as f:
+                    igual = f.read() == md_content
+            except OSError:
+                igual = False
+            if not igual:
+                with open(report_path, 'w') as f:
+                    f.write(md_content)
+
+        # A escrita do próprio relatório já entra nos tempos
+        if self.stats is not None:
+            with open(desempenho_path, 'w') as f:
+                f.write(self.stats.markdown())
         
         return report_path
\ No newline at end of file
@@ -0,0 +1,177 @@
+#wind.py
+
+# Perfil de vento em função da altitude (ex: sondagem ou previsão), usado pelo Solver no lugar das velocidades constantes do config.py
+# A tabela do arquivo (altitudes em qualquer espaçamento) é reamostrada uma única vez numa grade uniforme com passo dy
+# Assim cada consulta é O(1): o índice sai direto de (y - y0)/dy, sem busca, e a interpolação é linear dentro do intervalo
+# Como na atmosfera, há um caminho rápido para escalares (listas do Python) e outro vetorizado para arrays
+# Acima e abaixo da tabela o vento é mantido constante (igual ao do ponto mais próximo)
+
+# Um perfil pode ter vários membros (ex: membros de uma previsão por ensemble), todos na mesma grade:
+#   - o Solver usa um membro de cada vez (o membro atual, ver member)
+#   - o modo ensemble do Solver sorteia um membro para cada trajetória e avalia todos de uma vez (ver at)
+
+# Formato do arquivo: texto com cabeçalho, colunas separadas por vírgula ou espaços, linhas começando com # são ignoradas
+#   altura,vx,vy                      componentes [m/s] no plano da simulação (vy opcional)
+#   altura,direcao,velocidade         direção de onde o vento vem [graus, 0 = norte, 90 = leste] e velocidade [m/s]
+#                                     (projetada no eixo x da simulação, que aponta para o azimute dado em load)
+# altura é a altitude em relação ao solo [m], como y no Solver
+
+import hashlib
+import math
+import os
+
+import numpy as np
+
+# Perfis já lidos: {(caminho, mtime, tamanho, dy, azimute): WindProfile} --> o mesmo arquivo não é lido nem reamostrado de novo
+_PERFIS_LIDOS = {}
+
+class WindProfile:
+    def __init__(self, altitudes, vx, vy=None, dy=10.0):
+        # altitudes: (k,) crescentes [m]
+        # vx, vy: (k,) para um perfil ou (n_membros, k) para um ensemble de perfis [m/s] (vy = None --> sem vento vertical)
+        # dy: passo da grade uniforme [m]
+
+        altitudes = np.asarray(altitudes, dtype=float)
+        vx = np.atleast_2d(np.asarray(vx, dtype=float))
+        vy = np.zeros_like(vx) if vy is None else np.atleast_2d(np.asarray(vy, dtype=float))
+
+        if altitudes.ndim != 1 or len(altitudes) < 2:
+            raise ValueError("O perfil de vento precisa de pelo menos duas altitudes.")
+        if np.any(np.diff(altitudes) <= 0):
+            raise ValueError("As altitudes do perfil de vento devem ser crescentes.")
+        if vx.shape[1] != len(altitudes) or vy.shape != vx.shape:
+            raise ValueError("vx e vy devem ter um valor por altitude.")
+
+        # Tabela original (usada para juntar perfis em stack e medir o erro da reamostragem)
+        self.altitudes, self._vx_orig, self._vy_orig = altitudes, vx, vy
+
+        # Grade uniforme cobrindo a tabela
+        self.dy = float(dy)
+        self.y0 = float(altitudes[0])
+        n = max(int(math.ceil((altitudes[-1] - altitudes[0]) / dy)) + 1, 2)
+        y = self.y0 + np.arange(n) * dy
+
+        self._vx_tab = np.array([np.interp(y, altitudes, membro) for membro in vx])
+        self._vy_tab = np.array([np.interp(y, altitudes, membro) for membro in vy])
+        self._dvx_tab = np.diff(self._vx_tab, axis=1)
+        self._dvy_tab = np.diff(self._vy_tab, axis=1)
+        self._n = n
+
+        # Erro máximo da reamostragem nas altitudes da tabela original [m/s] (zero quando elas caem na grade)
+        self.max_error = float(max(
+            np.max(np.abs(self.at(altitudes, membro)[0] - vx[membro])) + np.max(np.abs(self.at(altitudes, membro)[1] - vy[membro]))
+            for membro in range(len(vx))
+        ))
+
+        self.select(0)
+
+    @property
+    def n_members(self):
+        return len(self._vx_tab)
+
+    def select(self, membro):
+        # Escolhe o membro usado nas consultas escalares (__call__ e slope)
+        if not 0 <= membro < self.n_members:
+            raise ValueError(f"Membro {membro} não existe (o perfil tem {self.n_members}).")
+        self.membro = membro
+
+        # Cópias em listas do Python: indexar listas com escalares é bem mais rápido que indexar arrays
+        self._vx_lista = self._vx_tab[membro].tolist()
+        self._vy_lista = self._vy_tab[membro].tolist()
+        self._dvx_lista = self._dvx_tab[membro].tolist()
+        self._dvy_lista = self._dvy_tab[membro].tolist()
+        return self
+
+    def member(self, membro):
+        # Cópia leve com outro membro selecionado (as tabelas são compartilhadas, nada é reinterpolado)
+        copia = object.__new__(WindProfile)
+        copia.__dict__.update(self.__dict__)
+        return copia.select(membro)
+
+    def __call__(self, y):
+        # Vento (vx, vy) [m/s] na altitude y para o membro selecionado (escalar ou array)
+
+        if isinstance(y, (float, int)):
+            u = (float(y) - self.y0) / self.dy
+            if u <= 0:
+                return self._vx_lista[0], self._vy_lista[0]
+            i = int(u)
+            if i >= self._n - 1:
+                return self._vx_lista[-1], self._vy_lista[-1]
+            f = u - i
+            return self._vx_lista[i] + f * self._dvx_lista[i], self._vy_lista[i] + f * self._dvy_lista[i]
+
+        return self.at(y, self.membro)
+
+    def at(self, y, membros=None):
+        # Vento (vx, vy) para arrays de altitudes; membros: índice do membro de cada altitude (array do mesmo formato) ou um índice só
+        # None usa o membro selecionado
+
+        membros = self.membro if membros is None else membros
+        u = np.clip((np.asarray(y, dtype=float) - self.y0) / self.dy, 0, self._n - 1)
+        i = np.minimum(u.astype(np.intp), self._n - 2)
+        f = u - i
+        return (self._vx_tab[membros, i] + f * self._dvx_tab[membros, i],
+                self._vy_tab[membros, i] + f * self._dvy_tab[membros, i])
+
+    def slope(self, y):
+        # Derivadas (dvx/dy, dvy/dy) [1/s] na altitude y para o membro selecionado (usadas na Jacobiana do Solver)
+        u = (float(y) - self.y0) / self.dy
+        if u <= 0 or u >= self._n - 1:
+            return 0.0, 0.0
+        i = int(u)
+        return self._dvx_lista[i] / self.dy, self._dvy_lista[i] / self.dy
+
+    def digest(self):
+        # Hash das tabelas (entra na chave do cache de resultados no lugar do nome do arquivo)
+        h = hashlib.sha256()
+        for array in (np.array([self.y0, self.dy, self.membro]), self._vx_tab, self._vy_tab):
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()
+
+    @classmethod
+    def stack(cls, perfis, dy=None):
+        # Junta perfis (ex: um arquivo por membro de uma previsão) num único perfil com vários membros
+        # Todos são reamostrados numa grade comum que cobre as altitudes de todos
+
+        altitudes = np.unique(np.concatenate([perfil.altitudes for perfil in perfis]))
+        vx = [np.interp(altitudes, perfil.altitudes, membro) for perfil in perfis for membro in perfil._vx_orig]
+        vy = [np.interp(altitudes, perfil.altitudes, membro) for perfil in perfis for membro in perfil._vy_orig]
+        return cls(altitudes, vx, vy, dy=dy or min(perfil.dy for perfil in perfis))
+
+    @classmethod
+    def load(cls, path, dy=10.0, azimute=90.0):
+        # Lê um arquivo de perfil (ver o formato no topo do arquivo)
+        # azimute: direção para onde aponta o eixo x da simulação [graus] (só para arquivos com direção e velocidade)
+        # O resultado fica guardado: ler de novo o mesmo arquivo (não modificado) não custa nada
+
+        info = os.stat(path)
+        chave = (os.path.realpath(path), info.st_mtime_ns, info.st_size, dy, azimute)
+        if chave not in _PERFIS_LIDOS:
+            _PERFIS_LIDOS[chave] = cls._read(path, dy, azimute)
+        return _PERFIS_LIDOS[chave].member(0)
+
+    @classmethod
+    def _read(cls, path, dy, azimute):
+        with open(path) as f:
+            linhas = [linha.strip() for linha in f if linha.strip() and not linha.lstrip().startswith('#')]
+
+        separador = ',' if ',' in linhas[0] else None
+        colunas = [nome.strip().lower() for nome in linhas[0].split(separador)]
+        dados = np.array([[float(v) for v in linha.split(separador)] for linha in linhas[1:]])
+        coluna = {nome: dados[:, j] for j, nome in enumerate(colunas)}
+
+        if 'altura' not in coluna:
+            raise ValueError(f"O arquivo {path} precisa de uma coluna 'altura'.")
+
+        if 'vx' in coluna:
+            vx, vy = coluna['vx'], coluna.get('vy')
+        elif 'direcao' in coluna and 'velocidade' in coluna:
+            # O vento vem da direção dada, então sopra para direcao + 180°
+            vx = -coluna['velocidade'] * np.cos(np.radians(coluna['direcao'] - azimute))
+            vy = None
+        else:
+            raise ValueError(f"O arquivo {path} precisa das colunas 'vx' (e 'vy') ou 'direcao' e 'velocidade'.")
+
+        ordem = np.argsort(coluna['altura'])
+        return cls(coluna['altura'][ordem], vx[ordem], None if vy is None else vy[ordem], dy=dy)